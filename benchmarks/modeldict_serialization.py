@@ -0,0 +1,73 @@
+"""
+Round-trip benchmark of ModelDict rows serialized with plain pickle versus
+the packed ``dumps_model_dicts``/``loads_model_dicts`` format.
+
+    python benchmarks/modeldict_serialization.py
+"""
+
+import pickle
+import timeit
+
+import django
+from django.conf import settings
+
+settings.configure()
+django.setup()
+
+from bananas.models import (
+    ModelDict,
+    dumps_model_dicts,
+    loads_model_dicts,
+)
+
+ROWS = 10_000
+NUMBER = 10
+
+
+def make_rows():
+    rows = [
+        ModelDict(
+            id=i,
+            name=f"Book {i}",
+            author__id=i % 100,
+            author__name=f"Author {i % 100}",
+            price=i * 1.5,
+        )
+        for i in range(ROWS)
+    ]
+    # Populate the nested cache, like rows that have been accessed
+    for row in rows:
+        row.author  # noqa: B018
+    return rows
+
+
+def bench(name, dumps, loads, rows):
+    data = dumps(rows)
+    seconds = timeit.timeit(lambda: loads(dumps(rows)), number=NUMBER) / NUMBER
+    print(f"{name:<20} {len(data):>10} bytes {seconds * 1000:>10.2f} ms")  # noqa: T201
+
+
+def main():
+    rows = make_rows()
+    print(f"{ROWS} rows, mean of {NUMBER} round trips")  # noqa: T201
+    bench(
+        "pickle",
+        lambda rows: pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL),
+        pickle.loads,
+        rows,
+    )
+    bench("packed pickle", dumps_model_dicts, loads_model_dicts, rows)
+    try:
+        import msgpack
+    except ImportError:
+        return
+    bench(
+        "packed msgpack",
+        lambda rows: dumps_model_dicts(rows, serializer="msgpack"),
+        lambda data: loads_model_dicts(data, serializer="msgpack"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
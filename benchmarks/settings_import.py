@@ -0,0 +1,82 @@
+"""
+Import time benchmark of the lazy bananas.settings module, reading one setting,
+versus a module eagerly parsing all settings from environment on import.
+
+    python benchmarks/settings_import.py [variables]
+"""
+
+import compileall
+import os
+import sys
+import tempfile
+import time
+
+VARIABLES = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+ROUNDS = 1_000
+
+EAGER_SETTINGS = """
+import bananas.environment
+
+ENV_SETTINGS = bananas.environment.get_settings()
+
+__all__ = list(ENV_SETTINGS)
+
+locals().update(ENV_SETTINGS)
+"""
+
+os.environ.update(
+    {
+        "DJANGO_DEBUG": "false",
+        "DJANGO_DATABASE_URL": "postgres://joar@db/tweets?conn_max_age=60",
+        "DJANGO_CACHE_URL": "redis://cache:6379/1?timeout=300",
+        "DJANGO_INTERNAL_IPS": "127.0.0.1, 10.0.0.1",
+        "DJANGO_FILE_UPLOAD_DIRECTORY_PERMISSIONS": "0o755",
+    }
+)
+os.environ.update({f"DJANGO_CUSTOM_SETTING_{i}": str(i) for i in range(VARIABLES)})
+
+import bananas.settings
+import bananas.url
+
+# Import both modules from the same directory, for equal import overhead
+DIRECTORY = tempfile.mkdtemp()
+with open(os.path.join(DIRECTORY, "eager_settings.py"), "w") as module:
+    module.write(EAGER_SETTINGS)
+with open(os.path.join(DIRECTORY, "lazy_settings.py"), "w") as module:
+    with open(bananas.settings.__file__) as source:
+        module.write(source.read())
+compileall.compile_dir(DIRECTORY, quiet=1)
+sys.path.insert(0, DIRECTORY)
+
+
+def import_eager():
+    sys.modules.pop("eager_settings", None)
+    import eager_settings
+
+    return eager_settings.DEBUG
+
+
+def import_lazy():
+    sys.modules.pop("lazy_settings", None)
+    import lazy_settings
+
+    return lazy_settings.DEBUG
+
+
+def bench(name, func):
+    func()
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        func()
+    seconds = time.perf_counter() - start
+    print(f"{name:<8} {seconds / ROUNDS * 1e6:>10.1f} µs")  # noqa: T201
+
+
+def main():
+    print(f"{len(os.environ)} environment variables")  # noqa: T201
+    bench("eager", import_eager)
+    bench("lazy", import_lazy)
+
+
+if __name__ == "__main__":
+    main()
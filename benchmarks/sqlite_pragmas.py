@@ -0,0 +1,72 @@
+"""
+Write throughput benchmark of a file backed SQLite database with default
+settings versus the WAL pragmas configured from the database URL.
+
+    python benchmarks/sqlite_pragmas.py [rows]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+import django
+from django.conf import settings
+
+from bananas.url import database_conf_from_url
+
+DIRECTORY = tempfile.mkdtemp()
+
+
+def sqlite_url(name, query=""):
+    return f"sqlite:///{quote(os.path.join(DIRECTORY, name), safe='')}{query}"
+
+
+settings.configure(
+    DATABASES={
+        "default": database_conf_from_url(sqlite_url("default.sqlite3")),
+        "pragmas": database_conf_from_url(
+            sqlite_url(
+                "pragmas.sqlite3",
+                "?journal_mode=wal&synchronous=normal&mmap_size=268435456"
+                "&cache_size=-65536&busy_timeout=5000",
+            )
+        ),
+    },
+)
+django.setup()
+
+from django.db import connections, models
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+
+
+class Row(models.Model):
+    text = models.CharField(max_length=255)
+
+    class Meta:
+        app_label = "benchmarks"
+
+
+def bench(alias):
+    with connections[alias].schema_editor() as schema_editor:
+        schema_editor.create_model(Row)
+
+    # One transaction per row, like a web app saving objects in autocommit
+    start = time.perf_counter()
+    for i in range(ROWS):
+        Row.objects.using(alias).create(text=str(i))
+    seconds = time.perf_counter() - start
+
+    print(f"{alias:<10} {seconds:>8.2f} s {ROWS / seconds:>10.0f} rows/s")  # noqa: T201
+
+
+def main():
+    print(f"{ROWS} single row transactions")  # noqa: T201
+    bench("default")
+    bench("pragmas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Insert benchmark of random version 4 UUID primary keys versus time-ordered
+version 7 UUID primary keys, on a file backed SQLite database.
+
+    python benchmarks/uuid_inserts.py [rows]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import django
+from django.conf import settings
+
+DIRECTORY = tempfile.mkdtemp()
+
+settings.configure(
+    DATABASES={
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.path.join(DIRECTORY, "uuid_inserts.sqlite3"),
+        }
+    },
+)
+django.setup()
+
+from django.db import connection, models
+
+from bananas.models import uuid7
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+BATCH_SIZE = 1_000
+
+
+class UUID4Row(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    text = models.CharField(max_length=255)
+
+    class Meta:
+        app_label = "benchmarks"
+
+
+class UUID7Row(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid7)
+    text = models.CharField(max_length=255)
+
+    class Meta:
+        app_label = "benchmarks"
+
+
+def bench(model):
+    with connection.schema_editor() as schema_editor:
+        schema_editor.create_model(model)
+
+    start = time.perf_counter()
+    for offset in range(0, ROWS, BATCH_SIZE):
+        model.objects.bulk_create(
+            model(text=str(i)) for i in range(offset, offset + BATCH_SIZE)
+        )
+    seconds = time.perf_counter() - start
+
+    print(  # noqa: T201
+        f"{model.__name__:<10} {seconds:>8.2f} s {ROWS / seconds:>10.0f} rows/s"
+    )
+
+
+def main():
+    print(f"{ROWS} rows in batches of {BATCH_SIZE}")  # noqa: T201
+    bench(UUID4Row)
+    bench(UUID7Row)
+
+
+if __name__ == "__main__":
+    main()
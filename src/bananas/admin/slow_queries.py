@@ -0,0 +1,25 @@
+from django.http import HttpRequest, HttpResponse
+
+from bananas.query import slow_queries
+
+from .extension import AdminView
+
+
+class SlowQueriesAdminView(AdminView):
+    """
+    Lists the slow .dicts() queries captured by the serving process.
+
+    Not registered by default, enable it with
+    ``bananas.admin.register(SlowQueriesAdminView)``.
+    """
+
+    verbose_name = "Slow queries"
+
+    def get(self, request: HttpRequest) -> HttpResponse:
+        return self.render(
+            "admin/bananas/slow_queries.html",
+            {
+                "slow_queries": list(reversed(list(slow_queries))),
+                "threshold": slow_queries.get_threshold(),
+            },
+        )
@@ -0,0 +1,155 @@
+import datetime
+import hashlib
+from typing import Any, Dict, NamedTuple, Optional
+
+from django.db.models import Count, Max, Model, QuerySet
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.mixins import ListModelMixin, RetrieveModelMixin
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.viewsets import GenericViewSet
+
+from bananas.models import TimeStampedModel, VersionedModel
+
+from .fencing import parse_date_modified, parse_version
+
+__all__ = (
+    "Validators",
+    "ConditionalRetrieveModelMixin",
+    "ConditionalListModelMixin",
+    "is_not_modified",
+)
+
+
+class Validators(NamedTuple):
+    etag: Optional[str] = None
+    last_modified: Optional[datetime.datetime] = None
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag is not None:
+            headers["ETag"] = quote_etag(self.etag)
+        if self.last_modified is not None:
+            headers["Last-Modified"] = http_date(self.last_modified.timestamp())
+        return headers
+
+
+def _weak(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def is_not_modified(request: Request, validators: Validators) -> bool:
+    """
+    Evaluate If-None-Match, or If-Modified-Since in its absence, against the
+    validators of the current representation, following RFC 7232.
+    """
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        if validators.etag is None:
+            return False
+        etags = parse_etags(if_none_match)
+        if etags == ["*"]:
+            return True
+        etag = _weak(quote_etag(validators.etag))
+        return any(_weak(tag) == etag for tag in etags)
+
+    if_modified_since = request.headers.get("If-Modified-Since")
+    if if_modified_since is not None and validators.last_modified is not None:
+        timestamp = parse_http_date_safe(if_modified_since)
+        return (
+            timestamp is not None
+            and int(validators.last_modified.timestamp()) <= timestamp
+        )
+    return False
+
+
+def not_modified(validators: Validators) -> Response:
+    return Response(status=status.HTTP_304_NOT_MODIFIED, headers=validators.headers)
+
+
+class ConditionalRetrieveModelMixin(RetrieveModelMixin):
+    """
+    Answer retrieve requests with ``304 Not Modified`` when the client's
+    representation is current, before serializing the instance.
+    """
+
+    def get_etag(self, instance: Model) -> Optional[str]:
+        if isinstance(instance, VersionedModel):
+            return parse_version(instance)
+        return None
+
+    def get_last_modified(self, instance: Model) -> Optional[datetime.datetime]:
+        if isinstance(instance, TimeStampedModel):
+            return parse_date_modified(instance)
+        return None
+
+    def retrieve(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        assert isinstance(self, GenericViewSet)
+        instance = self.get_object()
+        validators = Validators(
+            etag=self.get_etag(instance),
+            last_modified=self.get_last_modified(instance),
+        )
+        if is_not_modified(request, validators):
+            return not_modified(validators)
+
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data, headers=validators.headers)
+
+
+class ConditionalListModelMixin(ListModelMixin):
+    """
+    Answer list requests with ``304 Not Modified`` when the client's
+    representation is current, before fetching or serializing any rows.
+
+    The validators of a list are derived from the number of listed rows and
+    their latest ``last_modified_field``, in a single aggregate query. Any
+    change to a row bumps the latter and any addition or removal the former,
+    as long as ``last_modified_field`` is an ``auto_now`` field.
+    """
+
+    last_modified_field: str = "date_modified"
+
+    def get_list_validators(self, queryset: QuerySet) -> Validators:
+        aggregates = queryset.order_by().aggregate(
+            last_modified=Max(self.last_modified_field), count=Count("pk")
+        )
+        last_modified = aggregates["last_modified"]
+
+        # Pagination and filtering parameters select the listed rows as well.
+        # Unlike Last-Modified, the ETag tells apart changes within a second.
+        assert isinstance(self, GenericViewSet)
+        key = "{}:{}:{}".format(
+            self.request.get_full_path(),
+            aggregates["count"],
+            last_modified.isoformat() if last_modified is not None else "",
+        )
+        return Validators(
+            etag="W/" + quote_etag(hashlib.sha1(key.encode()).hexdigest()),
+            last_modified=(
+                last_modified.replace(microsecond=0)
+                if last_modified is not None
+                else None
+            ),
+        )
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        assert isinstance(self, GenericViewSet)
+        queryset = self.filter_queryset(self.get_queryset())
+        validators = self.get_list_validators(queryset)
+        if is_not_modified(request, validators):
+            return not_modified(validators)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+        else:
+            serializer = self.get_serializer(queryset, many=True)
+            response = Response(serializer.data)
+
+        for header, value in validators.headers.items():
+            response[header] = value
+        return response
@@ -3,23 +3,34 @@ import datetime
 import operator
 from functools import wraps
 from typing import (
+    AbstractSet,
     Any,
     Callable,
+    Dict,
     Final,
     FrozenSet,
     Generic,
+    Iterable,
     List,
     NoReturn,
     Optional,
+    Type,
     TypeVar,
     cast,
 )
 
 from django.conf import settings
-from django.core.exceptions import ImproperlyConfigured
-from django.db.models import Model, QuerySet
+from django.core.exceptions import (
+    ImproperlyConfigured,
+    ValidationError as DjangoValidationError,
+)
+from django.db import router, transaction
+from django.db.models import F, Field, Model, Q, QuerySet
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, NotFound
 from rest_framework.mixins import UpdateModelMixin
 from rest_framework.request import Request
 from rest_framework.response import Response
@@ -28,19 +39,31 @@ from rest_framework.viewsets import GenericViewSet
 from typing_extensions import Protocol, final
 
 from bananas.admin.api.schemas.yasg import BananasSwaggerSchema
-from bananas.models import TimeStampedModel
-
-from . import errors
-from .utils import HeaderError, parse_header_datetime, parse_header_etags
+from bananas.models import FieldVersionedModel, TimeStampedModel, VersionedModel
+
+from . import errors, metrics
+from .utils import (
+    HeaderError,
+    parse_datetime,
+    parse_etags,
+    parse_header_datetime,
+    parse_header_etags,
+)
 
 __all__ = (
     "Fence",
     "FencedUpdateModelMixin",
+    "FencedBulkUpdateModelMixin",
     "header_date_parser",
     "parse_date_modified",
+    "date_modified_condition",
     "allow_if_unmodified_since",
     "header_etag_parser",
     "allow_if_match",
+    "parse_version",
+    "parse_versions",
+    "version_condition",
+    "allow_if_version_match",
 )
 
 
@@ -57,10 +80,14 @@ class Fence(abc.ABC, Generic[InstanceType, TokenType]):
         get_version: Callable[[InstanceType], Optional[TokenType]],
         openapi_parameter: openapi.Parameter,
         rejection: Optional[Exception] = None,
+        get_condition: Optional[Callable[[TokenType], Q]] = None,
+        parse_token: Optional[Callable[[str], TokenType]] = None,
     ) -> None:
         self._get_token: Final = get_token
+        self._parse_token: Final = parse_token
         self._compare: Final = compare
         self._get_version: Final = get_version
+        self._get_condition: Final = get_condition
         self._rejection: Final = (
             rejection
             if rejection is not None
@@ -71,13 +98,45 @@ class Fence(abc.ABC, Generic[InstanceType, TokenType]):
         self.openapi_parameter: Final = openapi_parameter
 
     def check(self, request: Request, instance: InstanceType) -> bool:
-        version = self._get_version(instance)
-        if version is None:
-            # We might want to expose control of this behavior. For if-unmodified-since
-            # it makes sense to return true here, but it might not for
-            # if-modified-since other conditionals.
-            return True
-        return self._compare(version, self._get_token(request))
+        with metrics.observe("check"):
+            version = self._get_version(instance)
+            if version is None:
+                # We might want to expose control of this behavior. For
+                # if-unmodified-since it makes sense to return true here, but it
+                # might not for if-modified-since other conditionals.
+                return True
+            return self._compare(version, self.get_token(request))
+
+    def parse_token(self, value: str) -> TokenType:
+        """
+        Parse a token given outside of the request headers, like for each item
+        of a bulk update.
+        """
+        if self._parse_token is None:
+            raise ImproperlyConfigured("Fence does not support bulk updates.")
+        return self._parse_token(value)
+
+    def check_token(self, token: TokenType, instance: InstanceType) -> bool:
+        with metrics.observe("check"):
+            version = self._get_version(instance)
+            return version is None or self._compare(version, token)
+
+    def get_token(self, request: Request) -> TokenType:
+        with metrics.observe("parse"):
+            return self._get_token(request)
+
+    def condition(self, request: Request) -> Q:
+        """
+        Express the fence as a query filter on the fenced rows, that allows
+        checking it in the same statement as the update.
+        """
+        if self._get_condition is None:
+            raise ImproperlyConfigured("Fence does not support query conditions.")
+        return self._get_condition(self.get_token(request))
+
+    @property
+    def rejection(self) -> Exception:
+        return self._rejection
 
     def reject(self) -> NoReturn:
         raise self._rejection
@@ -110,6 +169,14 @@ class UsesQuerySet(Protocol[_MT_co]):
 
 
 class FencedUpdateModelMixin(UpdateModelMixin, abc.ABC):
+    # Check the fence in the UPDATE statement rather than before saving
+    atomic_fence: bool = False
+    # Reject stale updates before validating the request data
+    early_fence: bool = False
+    # Accept stale updates of fields that haven't changed since, for models
+    # tracking field versions fenced by allow_if_version_match()
+    merge_fence: bool = False
+
     @property
     @abc.abstractmethod
     def fence(self) -> Fence: ...
@@ -127,18 +194,273 @@ class FencedUpdateModelMixin(UpdateModelMixin, abc.ABC):
         # here instead.
         assert isinstance(self, GenericViewSet)
         assert isinstance(serializer, ModelSerializer)
+        if self.merge_fence:
+            self.perform_merged_update(serializer)
+            return
+        if self.atomic_fence:
+            self.perform_fenced_update(serializer)
+            return
         self.fence.validate(self.request, serializer.instance)
-        super().perform_update(serializer)
+        with metrics.observe("update"):
+            super().perform_update(serializer)
+
+    def perform_merged_update(self, serializer: ModelSerializer) -> None:
+        """
+        Save the validated fields on the current, locked, row. A stale token is
+        accepted as long as none of the updated fields changed since its
+        version, so that only conflicting concurrent updates are rejected.
+        """
+        assert isinstance(self, GenericViewSet)
+        instance = serializer.instance
+        if not isinstance(instance, FieldVersionedModel):
+            raise ImproperlyConfigured(
+                "Merged fenced updates require a FieldVersionedModel."
+            )
+        token = self.fence.get_token(self.request)
+        if not isinstance(token, AbstractSet):
+            raise ImproperlyConfigured(
+                "Merged fenced updates require a version fence, like "
+                "allow_if_version_match()."
+            )
+        data = serializer.validated_data
+        for name in data:
+            field = instance._meta.get_field(name)
+            if not field.concrete or field.many_to_many:
+                raise ImproperlyConfigured(
+                    f"Merged fenced updates can't update the field {name!r}."
+                )
+
+        using = instance._state.db
+        with transaction.atomic(using=using):
+            current = (
+                type(instance)
+                ._base_manager.using(using)
+                .select_for_update()
+                .get(pk=instance.pk)
+            )
+            if not self.fence.check_token(token, current):
+                versions = parse_versions(token)
+                # Versions newer than the current one can't be based on it
+                if (
+                    not versions
+                    or max(versions) > current.version
+                    or current.get_changed_fields(max(versions), data)
+                ):
+                    self.fence.reject()
+            for name, value in data.items():
+                setattr(current, name, value)
+            with metrics.observe("update"):
+                current.save(update_fields=list(data))
+        serializer.instance = current
+
+    def perform_fenced_update(self, serializer: ModelSerializer) -> None:
+        """
+        Write the validated fields in a single UPDATE, conditioned on the fence,
+        rejecting the request when no row was updated. Unlike validating the
+        fence before saving, this can't race with a concurrent update.
+        """
+        assert isinstance(self, GenericViewSet)
+        instance = serializer.instance
+        assert instance is not None
+        opts = instance._meta
+        condition = self.fence.condition(self.request)
+
+        update_fields = []
+        for name, value in serializer.validated_data.items():
+            field = opts.get_field(name)
+            if not field.concrete or field.many_to_many:
+                raise ImproperlyConfigured(
+                    f"Atomic fenced updates can't update the field {name!r}."
+                )
+            setattr(instance, name, value)
+            update_fields.append(field)
+
+        # Bump auto_now fields, like date_modified, as saving would
+        update_fields.extend(
+            field
+            for field in opts.concrete_fields
+            if getattr(field, "auto_now", False) and field not in update_fields
+        )
+        values = {
+            field.attname: field.pre_save(instance, add=False)
+            for field in update_fields
+        }
+        versioned = isinstance(instance, VersionedModel)
+        if versioned:
+            values["version"] = F("version") + 1
+        if isinstance(instance, FieldVersionedModel):
+            # Unlike save(), this can't record the version of the fields
+            values["field_versions"] = None
+
+        # Checking the fence and updating is a single statement
+        with metrics.observe("update"):
+            updated = (
+                type(instance)
+                ._base_manager.using(instance._state.db)
+                .filter(condition, pk=instance.pk)
+                .update(**values)
+            )
+        if not updated:
+            self.fence.reject()
+        if versioned:
+            instance.refresh_from_db(fields=["version"])
+
+    def get_fence_metrics_name(self) -> str:
+        """
+        Name of the view-set in fence metrics.
+        """
+        return type(self).__name__
+
+    def check_fence_early(self) -> None:
+        """
+        Reject the request when the fenced row exists but fails the fence,
+        with a single query, so that stale updates don't pay for validating
+        the request data. Only rejected requests load the instance, to check
+        object permissions before rejecting. The fence is still validated
+        against the loaded instance afterwards.
+        """
+        assert isinstance(self, GenericViewSet)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        condition = self.fence.condition(self.request)
+        with metrics.observe("check"):
+            rejected = queryset.filter(~condition).exists()
+        if rejected:
+            # Lacking permissions takes precedence over failing the fence
+            self.get_object()
+            self.fence.reject()
 
     @swagger_auto_schema(auto_schema=FenceAwareSwaggerAutoSchema)
     def update(self, request: Request, *args: Any, **kwargs: Any) -> Response:
-        return super().update(request, *args, **kwargs)
+        # Partial updates are also routed through here. Merged updates accept
+        # some of the updates rejected early.
+        with metrics.track(self.get_fence_metrics_name(), self.fence.rejection):
+            if self.early_fence and not self.merge_fence:
+                self.check_fence_early()
+            return super().update(request, *args, **kwargs)
 
     @swagger_auto_schema(auto_schema=FenceAwareSwaggerAutoSchema)
     def partial_update(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         return super().partial_update(request, *args, **kwargs)
 
 
+class FencedBulkUpdateModelMixin(FencedUpdateModelMixin):
+    """
+    Adds a ``PATCH .../bulk/`` endpoint taking a list of partial updates, each
+    fenced by its own token, as ``{"id": ..., "token": ..., "changes": {...}}``.
+
+    All targets are loaded and locked in a single query, and the accepted
+    updates written in a single transaction. Items are answered in order,
+    each with its own status: rejected items don't prevent accepted ones from
+    being written.
+    """
+
+    max_bulk_size: int = 100
+
+    def get_bulk_items(self, data: Any) -> List[Dict[str, Any]]:
+        assert isinstance(self, GenericViewSet)
+        if not isinstance(data, list):
+            raise errors.BadRequest("Expected a list of updates.")
+        if len(data) > self.max_bulk_size:
+            raise errors.BadRequest(
+                f"Expected at most {self.max_bulk_size} updates, got {len(data)}."
+            )
+
+        model: Type[Model] = self.get_queryset().model
+        lookup_field = (
+            model._meta.pk
+            if self.lookup_field == "pk"
+            else model._meta.get_field(self.lookup_field)
+        )
+        assert isinstance(lookup_field, Field)
+        items = []
+        for item in data:
+            if (
+                not isinstance(item, dict)
+                or "id" not in item
+                or not isinstance(item.get("token"), str)
+                or not isinstance(item.get("changes"), dict)
+            ):
+                raise errors.BadRequest(
+                    'Expected updates as {"id": ..., "token": ..., "changes": {...}}.'
+                )
+            try:
+                key = lookup_field.to_python(item["id"])
+            except DjangoValidationError as e:
+                raise errors.BadRequest(f"Invalid id: {item['id']!r}") from e
+            items.append({**item, "key": key})
+
+        if len({item["key"] for item in items}) != len(items):
+            raise errors.BadRequest("Expected each id to be updated at most once.")
+        return items
+
+    def perform_bulk_update(self, serializers: List[BaseSerializer]) -> None:
+        for serializer in serializers:
+            serializer.save()
+
+    @action(detail=False, methods=["patch"], url_path="bulk")
+    def bulk_partial_update(self, request: Request) -> Response:
+        with metrics.scope(self.get_fence_metrics_name()):
+            return self.perform_bulk_partial_update(request)
+
+    def perform_bulk_partial_update(self, request: Request) -> Response:
+        assert isinstance(self, GenericViewSet)
+        items = self.get_bulk_items(request.data)
+        queryset = self.filter_queryset(self.get_queryset())
+
+        results: List[Dict[str, Any]] = []
+        accepted = []
+        with transaction.atomic(using=router.db_for_write(queryset.model)):
+            instances = queryset.select_for_update().in_bulk(
+                [item["key"] for item in items], field_name=self.lookup_field
+            )
+            for item in items:
+                result: Dict[str, Any] = {"id": item["id"]}
+                results.append(result)
+
+                instance = instances.get(item["key"])
+                try:
+                    if instance is None:
+                        raise NotFound()
+                    self.check_object_permissions(request, instance)
+                    try:
+                        with metrics.observe("parse"):
+                            token = self.fence.parse_token(item["token"])
+                    except ValueError as e:
+                        metrics.increment(metrics.MALFORMED_HEADER)
+                        raise errors.BadRequest(
+                            f"Malformed token: {item['token']}"
+                        ) from e
+                    if not self.fence.check_token(token, instance):
+                        metrics.increment(metrics.REJECTED)
+                        self.fence.reject()
+                except APIException as e:
+                    result.update(status=e.status_code, detail=e.detail)
+                    continue
+
+                serializer = self.get_serializer(
+                    instance, data=item["changes"], partial=True
+                )
+                if not serializer.is_valid():
+                    result.update(
+                        status=status.HTTP_400_BAD_REQUEST, detail=serializer.errors
+                    )
+                    continue
+                # Like single updates, invalid ones aren't counted
+                metrics.increment(metrics.ACCEPTED)
+                result["status"] = status.HTTP_200_OK
+                accepted.append((result, serializer))
+
+            with metrics.observe("update"):
+                self.perform_bulk_update([serializer for _, serializer in accepted])
+
+        for result, serializer in accepted:
+            result["data"] = serializer.data
+        return Response(results)
+
+
 def header_date_parser(header: str) -> Callable[[Request], datetime.datetime]:
     def parse(request: Request) -> datetime.datetime:
         try:
@@ -157,6 +479,13 @@ def parse_date_modified(instance: TimeStampedModel) -> Optional[datetime.datetim
     )
 
 
+def date_modified_condition(token: datetime.datetime) -> Q:
+    # Versions are truncated to seconds before being compared to the token
+    return Q(date_modified__lt=token + datetime.timedelta(seconds=1)) | Q(
+        date_modified__isnull=True
+    )
+
+
 def allow_if_unmodified_since() -> Fence[TimeStampedModel, datetime.datetime]:
     if not settings.USE_TZ:
         raise ImproperlyConfigured(
@@ -178,6 +507,8 @@ def allow_if_unmodified_since() -> Fence[TimeStampedModel, datetime.datetime]:
                 "RFC7231 format."
             ),
         ),
+        get_condition=date_modified_condition,
+        parse_token=parse_datetime,
     )
 
 
@@ -207,7 +538,17 @@ def as_set(
 
 def allow_if_match(
     version_getter: Callable[[InstanceType], Optional[str]],
+    version_field: Optional[str] = None,
 ) -> Fence[InstanceType, FrozenSet[str]]:
+    """
+    Fence on If-Match matching the version of the instance. Passing the model
+    field holding the version as ``version_field`` supports atomic updates.
+    """
+    get_condition = (
+        None
+        if version_field is None
+        else lambda tokens: Q(**{f"{version_field}__in": tokens})
+    )
     return Fence(
         get_token=header_etag_parser("If-Match"),
         compare=operator.le,
@@ -222,4 +563,43 @@ def allow_if_match(
                 "resource."
             ),
         ),
+        get_condition=get_condition,
+        parse_token=parse_etags,
+    )
+
+
+def parse_version(instance: VersionedModel) -> Optional[str]:
+    return str(instance.version) if instance.version is not None else None
+
+
+def parse_versions(tokens: Iterable[str]) -> List[int]:
+    # Tokens that aren't versions can't match, rather than failing the query
+    return [int(token) for token in tokens if token.isdigit()]
+
+
+def version_condition(tokens: FrozenSet[str]) -> Q:
+    return Q(version__in=parse_versions(tokens))
+
+
+def allow_if_version_match() -> Fence[VersionedModel, FrozenSet[str]]:
+    """
+    Fence on If-Match matching the version of a ``VersionedModel``, supporting
+    atomic updates.
+    """
+    return Fence(
+        get_token=header_etag_parser("If-Match"),
+        compare=operator.le,
+        get_version=as_set(parse_version),
+        openapi_parameter=openapi.Parameter(
+            in_=openapi.IN_HEADER,
+            name="If-Match",
+            type=openapi.TYPE_STRING,
+            required=True,
+            description=(
+                "Version or list of versions of the clients representation of the "
+                "resource."
+            ),
+        ),
+        get_condition=version_condition,
+        parse_token=parse_etags,
     )
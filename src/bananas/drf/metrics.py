@@ -0,0 +1,222 @@
+import abc
+import bisect
+import math
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, cast
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import APIException
+
+__all__ = (
+    "ACCEPTED",
+    "REJECTED",
+    "MISSING_HEADER",
+    "MALFORMED_HEADER",
+    "Histogram",
+    "FenceMetricsCollector",
+    "InMemoryFenceMetrics",
+    "fence_metrics",
+    "get_collector",
+    "observe",
+    "scope",
+    "increment",
+    "track",
+)
+
+ACCEPTED = "accepted"
+REJECTED = "rejected"
+MISSING_HEADER = "missing_header"
+MALFORMED_HEADER = "malformed_header"
+
+# Codes of the errors raised for header errors, see bananas.drf.utils
+HEADER_ERROR_OUTCOMES = {
+    "missing_header": MISSING_HEADER,
+    "invalid_header": MALFORMED_HEADER,
+}
+
+
+class Histogram(NamedTuple):
+    # Upper bounds in seconds, and the number of observations up to each bound
+    buckets: Tuple[float, ...]
+    counts: Tuple[int, ...]
+    samples: int
+    sum: float
+
+
+class FenceMetricsCollector(abc.ABC):
+    """
+    Receives the outcomes of fenced requests, and the time spent in the
+    stages of fencing them, per view-set.
+
+    Outcomes are ``accepted``, ``rejected``, ``missing_header`` and
+    ``malformed_header``. Stages are ``parse`` for parsing the token from the
+    request, ``check`` for checking the fence, including parsing, and
+    ``update`` for writing the update after the fence passed.
+    """
+
+    @abc.abstractmethod
+    def increment(self, view: str, outcome: str) -> None: ...
+
+    @abc.abstractmethod
+    def observe(self, view: str, stage: str, duration: float) -> None: ...
+
+
+class InMemoryFenceMetrics(FenceMetricsCollector):
+    """
+    Collects counters and histograms in the memory of the current process.
+    """
+
+    buckets: Tuple[float, ...] = (
+        0.0001,
+        0.0005,
+        0.001,
+        0.005,
+        0.01,
+        0.05,
+        0.1,
+        0.5,
+        1.0,
+        math.inf,
+    )
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Counter[Tuple[str, str]] = Counter()
+        self._histograms: Dict[Tuple[str, str], Tuple[List[int], List[float]]] = {}
+
+    def increment(self, view: str, outcome: str) -> None:
+        with self._lock:
+            self._counters[view, outcome] += 1
+
+    def observe(self, view: str, stage: str, duration: float) -> None:
+        index = bisect.bisect_left(self.buckets, duration)
+        with self._lock:
+            counts, total = self._histograms.setdefault(
+                (view, stage), ([0] * len(self.buckets), [0.0])
+            )
+            counts[index] += 1
+            total[0] += duration
+
+    def get_count(self, view: str, outcome: str) -> int:
+        return self._counters[view, outcome]
+
+    def get_counts(self) -> Dict[Tuple[str, str], int]:
+        with self._lock:
+            return dict(self._counters)
+
+    def get_histogram(self, view: str, stage: str) -> Histogram:
+        with self._lock:
+            counts, total = self._histograms.get(
+                (view, stage), ([0] * len(self.buckets), [0.0])
+            )
+            cumulative = []
+            samples = 0
+            for count in counts:
+                samples += count
+                cumulative.append(samples)
+            return Histogram(
+                buckets=self.buckets,
+                counts=tuple(cumulative),
+                samples=samples,
+                sum=total[0],
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+fence_metrics = InMemoryFenceMetrics()
+
+
+@lru_cache(maxsize=None)
+def _load_collector(path: str) -> FenceMetricsCollector:
+    collector = import_string(path)
+    if isinstance(collector, type):
+        collector = collector()
+    return cast(FenceMetricsCollector, collector)
+
+
+def get_collector() -> FenceMetricsCollector:
+    """
+    Get the collector at the dotted path of
+    ``settings.BANANAS_FENCE_METRICS_COLLECTOR``, a collector class or
+    instance, defaulting to the in-memory ``fence_metrics``.
+    """
+    path: Optional[str] = getattr(settings, "BANANAS_FENCE_METRICS_COLLECTOR", None)
+    if path is None:
+        return fence_metrics
+    return _load_collector(path)
+
+
+_view: ContextVar[Optional[str]] = ContextVar("bananas_fence_view", default=None)
+
+
+@contextmanager
+def observe(stage: str) -> Iterator[None]:
+    """
+    Time a stage of fencing the current view-set's request, if any.
+    """
+    view = _view.get()
+    if view is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        get_collector().observe(view, stage, time.perf_counter() - start)
+
+
+def get_outcome(exc: Exception) -> Optional[str]:
+    if not isinstance(exc, APIException):
+        return None
+    code = exc.get_codes()
+    return HEADER_ERROR_OUTCOMES.get(code) if isinstance(code, str) else None
+
+
+@contextmanager
+def scope(view: str) -> Iterator[None]:
+    """
+    Let stages of fencing a request to a view-set be timed with ``observe``.
+    """
+    token = _view.set(view)
+    try:
+        yield
+    finally:
+        _view.reset(token)
+
+
+def increment(outcome: str) -> None:
+    """
+    Count an outcome of fencing the current view-set's request, if any.
+    """
+    view = _view.get()
+    if view is not None:
+        get_collector().increment(view, outcome)
+
+
+@contextmanager
+def track(view: str, rejection: Exception) -> Iterator[None]:
+    """
+    Count the outcome of a fenced request to a view-set, within its ``scope``.
+
+    Requests failing for other reasons than the fence, like validation or
+    permissions, aren't counted.
+    """
+    with scope(view):
+        try:
+            yield
+        except Exception as e:
+            outcome = REJECTED if e is rejection else get_outcome(e)
+            if outcome is not None:
+                increment(outcome)
+            raise
+        increment(ACCEPTED)
@@ -10,7 +10,9 @@ __all__ = (
     "HeaderError",
     "MissingHeader",
     "InvalidHeader",
+    "parse_datetime",
     "parse_header_datetime",
+    "parse_etags",
     "parse_header_etags",
 )
 
@@ -36,15 +38,19 @@ class InvalidHeader(HeaderError):
         super().__init__(f"Malformed header in request: {header}")
 
 
+def parse_datetime(value: str) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(
+        parse_http_date(value), tz=datetime.timezone.utc
+    )
+
+
 def parse_header_datetime(request: Request, header: str) -> datetime.datetime:
     try:
         value = request.headers[header]
     except KeyError as exc:
         raise MissingHeader(header) from exc
     try:
-        return datetime.datetime.fromtimestamp(
-            parse_http_date(value), tz=datetime.timezone.utc
-        )
+        return parse_datetime(value)
     except ValueError as e:
         raise InvalidHeader(header) from e
 
@@ -57,12 +63,19 @@ def clean_tags(tags: Iterable[str]) -> Iterable[str]:
             yield cleaned
 
 
+def parse_etags(value: str) -> FrozenSet[str]:
+    tags = frozenset(clean_tags(value.split(",")))
+    if not tags:
+        raise ValueError(f"Invalid etags: {value!r}")
+    return tags
+
+
 def parse_header_etags(request: Request, header: str) -> FrozenSet[str]:
     try:
-        parts = request.headers[header].split(",")
+        value = request.headers[header]
     except KeyError as exc:
         raise MissingHeader(header) from exc
-    tags = frozenset(clean_tags(parts))
-    if not tags:
-        raise InvalidHeader(header)
-    return tags
+    try:
+        return parse_etags(value)
+    except ValueError as e:
+        raise InvalidHeader(header) from e
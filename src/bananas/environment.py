@@ -8,7 +8,10 @@ from typing import (
     Final,
     Generic,
     Iterable,
+    Iterator,
     List,
+    Mapping,
+    MutableMapping,
     Optional,
     Set,
     Tuple,
@@ -48,6 +51,15 @@ SETTINGS_TYPES: Dict[str, type] = {
     "FILE_UPLOAD_DIRECTORY_PERMISSIONS": int,
 }
 
+# Separates the levels of nested settings, i.e. DJANGO_CACHES__default__TIMEOUT
+NESTED_SEPARATOR: Final = "__"
+
+# Settings holding a URL, parsed into the "default" entry of a nested setting
+URL_SETTINGS: Final = {
+    "DATABASE_URL": ("DATABASES", "database_conf_from_url"),
+    "CACHE_URL": ("CACHES", "cache_conf_from_url"),
+}
+
 
 def parse_str(value: str) -> str:
     """
@@ -163,44 +175,156 @@ def get_parser(typ: Type[P]) -> Callable[[str], P]:
         raise NotImplementedError("Unsupported setting type: %r", typ) from exc
 
 
-def get_settings() -> Dict[str, Any]:
+def get_nested_parser(key: str, path: List[str]) -> Callable[[str], Any]:
     """
-    Get and parse prefixed django settings from env.
+    Return appropriate parser for a nested setting, typing database and cache
+    settings like their URL parameters, and anything else as strings.
+
+    :param key: Top level setting name, i.e. "DATABASES"
+    :param path: Keys below the setting, i.e. ["default", "CONN_MAX_AGE"]
+    :return function: Parser
+    """
+    from . import url
 
-    TODO: Implement support for complex settings
-        DATABASES = {}
-        CACHES = {}
-        INSTALLED_APPS -> EXCLUDE_APPS ?
+    settings: Mapping[str, Tuple[str, Callable[[str], Any]]]
+    options: Mapping[str, Callable[[str], Any]]
 
-    :return dict:
+    if key == "DATABASES":
+        settings = {**url.SETTING_PARAMS, "port": ("PORT", parse_int)}
+        options = dict(url.OPTION_PARAMS.values())
+    elif key == "CACHES":
+        settings = url.CACHE_SETTING_PARAMS
+        options = url.CACHE_OPTION_PARAMS
+    else:
+        return parse_str
+
+    parsers = dict(settings.values())
+    if len(path) == 2 and path[1] in parsers:
+        return parsers[path[1]]
+    if len(path) == 3 and path[1] == "OPTIONS" and path[2] in options:
+        return options[path[2]]
+    if key == "DATABASES":
+        if path[1:] == ["OPTIONS", "pool"]:
+            return parse_bool
+        pool = dict(url.POOL_PARAMS.values())
+        if len(path) == 4 and path[1:3] == ["OPTIONS", "pool"] and path[3] in pool:
+            return pool[path[3]]
+        if len(path) == 3 and path[1] == "PRAGMAS":
+            return url.SQLITE_PRAGMA_PARAMS.get(path[2], parse_str)
+    return parse_str
+
+
+def merge_settings(
+    settings: MutableMapping[str, Any],
+    overrides: Mapping[str, Any],
+    strict: bool = False,
+) -> None:
+    """
+    Recursively merge settings, updating nested dicts rather than replacing
+    them.
+
+    :param settings: Settings to update, i.e. ``globals()`` of a settings module
+    :param overrides: Settings to merge into ``settings``
+    :param strict: Raise ValueError rather than replace a value with nested
+        settings, or nested settings with a value
+    """
+    for key, value in overrides.items():
+        current = settings.get(key)
+        if isinstance(current, dict) and isinstance(value, Mapping):
+            settings[key] = current = dict(current)
+            merge_settings(current, value, strict)
+        elif strict and key in settings:
+            raise ValueError(f'Both a value and nested settings given for "{key}"')
+        else:
+            settings[key] = value
+
+
+def iter_env_settings() -> Iterator[Tuple[str, str, List[str], str]]:
+    """
+    Iterate prefixed django settings in env, without parsing their values.
+
+    :return: Iterator of (setting name, key, nested path, value) tuples, where
+        the setting name of ``DATABASE_URL`` is ``DATABASES``
     """
-    settings = {}
     prefix = environ.get("DJANGO_SETTINGS_PREFIX", "DJANGO_")
-    parse: Callable[[str], object]
 
-    for key, value in environ.items():
-        _, _, key = key.partition(prefix)
+    for env_key in environ:
+        _, _, key = env_key.partition(prefix)
         if key:
+            # Only get values of prefixed keys, decoding values is costly
+            value = environ[env_key]
+            key, *path = key.split(NESTED_SEPARATOR)
             if key in UNSUPPORTED_ENV_SETTINGS:
                 raise ValueError(
                     f'Django setting "{key}" can not be '
                     "configured through environment."
                 )
+            name = URL_SETTINGS[key][0] if key in URL_SETTINGS and not path else key
+            yield name, key, path, value
 
-            default_value = getattr(global_settings, key, UNDEFINED)
 
-            if default_value is not UNDEFINED:
-                if default_value is None and key in SETTINGS_TYPES.keys():
-                    # Handle typed django settings defaulting to None
-                    parse = get_parser(SETTINGS_TYPES[key])
-                else:
-                    # Determine parser by django setting type
-                    parse = get_parser(type(default_value))  # type: ignore[type-var]
+def get_settings(*names: str) -> Dict[str, Any]:
+    """
+    Get and parse prefixed django settings from env.
 
-                value = parse(value)  # type: ignore[assignment]
+    Nested settings like ``DATABASES`` and ``CACHES`` are set per key with
+    ``__`` separated names, i.e. ``DJANGO_DATABASES__default__CONN_MAX_AGE``,
+    on top of the ``default`` entries parsed from ``DJANGO_DATABASE_URL`` and
+    ``DJANGO_CACHE_URL``.
 
-            settings[key] = value
+    :param names: Only parse these settings, defaults to all
+    :return dict:
+    """
+    env_settings = iter_env_settings()
+    if names:
+        env_settings = (setting for setting in env_settings if setting[0] in names)
+    return parse_settings(env_settings)
+
+
+def parse_settings(
+    env_settings: Iterable[Tuple[str, str, List[str], str]],
+) -> Dict[str, Any]:
+    """
+    Parse django settings from env, as iterated by ``iter_env_settings``.
+
+    :param env_settings: Iterable of (setting name, key, nested path, value)
+    :return dict:
+    """
+    from . import url
+
+    settings: Dict[str, Any] = {}
+    nested: Dict[str, Any] = {}
+    parse: Callable[[str], object]
+
+    for name, key, path, value in env_settings:
+        if path:
+            setting: Any = get_nested_parser(key, path)(value)
+            for level in reversed(path):
+                setting = {level: setting}
+            merge_settings(nested, {key: setting}, strict=True)
+            continue
+
+        if key in URL_SETTINGS:
+            conf_from_url = URL_SETTINGS[key][1]
+            conf = getattr(url, conf_from_url)(value)
+            merge_settings(settings, {name: {"default": conf}})
+            continue
+
+        default_value = getattr(global_settings, key, UNDEFINED)
+
+        if default_value is not UNDEFINED:
+            if default_value is None and key in SETTINGS_TYPES.keys():
+                # Handle typed django settings defaulting to None
+                parse = get_parser(SETTINGS_TYPES[key])
+            else:
+                # Determine parser by django setting type
+                parse = get_parser(type(default_value))  # type: ignore[type-var]
+
+            value = parse(value)  # type: ignore[assignment]
+
+        settings[key] = value
 
+    merge_settings(settings, nested)
     return settings
 
 
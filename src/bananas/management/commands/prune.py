@@ -0,0 +1,94 @@
+import datetime
+import time
+from typing import Any, Type
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.utils import timezone
+
+from bananas.models import TimeStampedModel
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete rows of a TimeStampedModel older than a cutoff, "
+        "in batches ordered by primary key"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("model", help="Model to prune, as app_label.ModelName")
+        parser.add_argument(
+            "--days",
+            type=int,
+            required=True,
+            help="Delete rows older than this number of days",
+        )
+        parser.add_argument(
+            "--field",
+            choices=("date_created", "date_modified"),
+            default="date_created",
+            help="Timestamp to compare with the cutoff (default: date_created)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Max number of rows to delete per batch (default: 1000)",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Seconds to sleep between batches (default: 0)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the rows that would be deleted",
+        )
+
+    def get_model(self, label: str) -> Type[TimeStampedModel]:
+        try:
+            model = apps.get_model(label)
+        except (LookupError, ValueError) as exc:
+            raise CommandError(str(exc)) from exc
+        if not issubclass(model, TimeStampedModel):
+            raise CommandError(f"{label} is not a TimeStampedModel")
+        return model
+
+    def handle(self, *args: object, **options: Any) -> None:
+        model = self.get_model(options["model"])
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be a positive number")
+
+        cutoff = timezone.now() - datetime.timedelta(days=options["days"])
+        field = options["field"]
+        queryset = model._base_manager.filter(**{f"{field}__lt": cutoff})
+
+        total = queryset.count()
+        if options["dry_run"]:
+            self.stdout.write(f"Would delete {total} rows older than {cutoff}")
+            return
+
+        deleted = 0
+        last_pk = None
+        while True:
+            batch = queryset.order_by("pk")
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            pks = list(batch.values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                break
+
+            last_pk = pks[-1]
+            _, per_model = model._base_manager.filter(pk__in=pks).delete()
+            deleted += per_model.get(model._meta.label, 0)
+            self.stdout.write(f"Deleted {deleted}/{total} rows")
+
+            if len(pks) < batch_size:
+                break
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+
+        self.stdout.write(f"Deleted {deleted} rows older than {cutoff}")
@@ -1,13 +1,35 @@
 import base64
 import binascii
+import datetime
 import math
 import os
+import pickle
+import threading
+import time
 import uuid
+from contextlib import ExitStack, contextmanager
 from itertools import chain
-from typing import Any, ClassVar, Dict, Final, Mapping, Optional, Sized
+from typing import (
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    Final,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sized,
+    Tuple,
+    Union,
+    cast,
+)
 
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -20,6 +42,12 @@ MISSING: Final = Missing()
 class ModelDict(Dict[str, Any]):
     _nested: Optional[Dict[str, "ModelDict"]] = None
 
+    def __reduce__(
+        self,
+    ) -> Tuple[type, Tuple[()], None, None, Iterator[Tuple[str, Any]]]:
+        # Leave out the _nested cache, it's rebuilt on access
+        return self.__class__, (), None, None, iter(self.items())
+
     def __getattr__(self, item: str) -> Any:
         """
         Try to to get attribute as key item.
@@ -61,7 +89,7 @@ class ModelDict(Dict[str, Any]):
 
             if keys:
                 # Construct nested dict of matched keys, stripped from prefix
-                n = ModelDict({key[len(item) + 2 :]: self[key] for key in keys})
+                n = self.__class__({key[len(item) + 2 :]: self[key] for key in keys})
 
                 # Cache and return
                 self._nested[item] = n
@@ -130,6 +158,234 @@ class ModelDict(Dict[str, Any]):
         return d
 
 
+class FrozenModelDict(ModelDict):
+    """
+    Immutable and hashable ModelDict, its hash is computed once on first use.
+    """
+
+    _hash: Optional[int] = None
+
+    def __hash__(self) -> int:  # type: ignore[override]
+        if self._hash is None:
+            self._hash = hash(frozenset(self.items()))
+        return self._hash
+
+    def __reduce__(self) -> Tuple[type, Tuple[Dict[str, Any]]]:  # type: ignore[override]
+        return self.__class__, (dict(self),)
+
+    def _immutable(self, *args: Any, **kwargs: Any) -> Any:
+        raise TypeError(f"{self.__class__.__name__} is immutable")
+
+    def expand(self) -> "FrozenModelDict":
+        # Expand a mutable copy instead of in place, freezing nested dicts too
+        expanded = ModelDict(self).expand()
+        for key, value in expanded.items():
+            if isinstance(value, ModelDict):
+                expanded[key] = self.__class__(value).expand()
+        return self.__class__(expanded)
+
+    __setitem__ = _immutable
+    __delitem__ = _immutable
+    __ior__ = _immutable
+    clear = _immutable
+    pop = _immutable
+    popitem = _immutable
+    setdefault = _immutable
+    update = _immutable
+
+
+PackedModelDicts = Tuple[Tuple[str, ...], List[List[Any]]]
+
+
+def pack_model_dicts(rows: Iterable[Mapping[str, Any]]) -> PackedModelDicts:
+    """
+    Pack rows sharing the same keys into the keys and a list of row values.
+
+    :param rows: Rows to pack, e.g. from ``queryset.dicts()``
+    :return: Tuple of keys and list of row values
+    """
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return (), []
+
+    keys = tuple(first)
+    values = [list(first.values())]
+    for row in rows:
+        if len(row) != len(keys):
+            raise ValueError("All packed rows must have the same keys")
+        try:
+            values.append([row[key] for key in keys])
+        except KeyError as exc:
+            raise ValueError("All packed rows must have the same keys") from exc
+
+    return keys, values
+
+
+def unpack_model_dicts(packed: PackedModelDicts) -> List[ModelDict]:
+    """
+    Unpack rows packed by ``pack_model_dicts``.
+
+    :param packed: Tuple of keys and list of row values
+    :return: List of ModelDict rows
+    """
+    keys, values = packed
+    return [ModelDict(zip(keys, row)) for row in values]
+
+
+def _get_codec(
+    serializer: str,
+) -> Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    if serializer == "pickle":
+        return (
+            lambda obj: pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL),
+            pickle.loads,
+        )
+
+    if serializer == "msgpack":
+        try:
+            import msgpack
+        except ImportError as exc:
+            raise ImportError(
+                "The msgpack serializer requires installing the msgpack extra"
+            ) from exc
+        return (
+            lambda obj: msgpack.packb(obj, use_bin_type=True),
+            lambda data: msgpack.unpackb(data, raw=False),
+        )
+
+    raise ValueError(f"Unknown serializer: {serializer!r}")
+
+
+def dumps_model_dicts(
+    rows: Iterable[Mapping[str, Any]], serializer: str = "pickle"
+) -> bytes:
+    """
+    Serialize rows compactly, writing the keys once followed by the row values.
+
+    Values have to be supported by the serializer, i.e. msgpack doesn't handle
+    datetimes, decimals or UUIDs.
+
+    :param rows: Rows to serialize, e.g. from ``queryset.dicts()``
+    :param serializer: "pickle" or "msgpack"
+    :return: Serialized rows
+    """
+    dumps, _ = _get_codec(serializer)
+    return dumps(pack_model_dicts(rows))
+
+
+def loads_model_dicts(data: bytes, serializer: str = "pickle") -> List[ModelDict]:
+    """
+    Deserialize rows serialized by ``dumps_model_dicts``.
+
+    :param data: Serialized rows
+    :param serializer: "pickle" or "msgpack"
+    :return: List of ModelDict rows
+    """
+    _, loads = _get_codec(serializer)
+    return unpack_model_dicts(loads(data))
+
+
+def encode_change_cursor(date_modified: datetime.datetime, pk: Any) -> str:
+    """
+    Encode a continuation token for ``TimeStampedQuerySetMixin.changed_since``.
+    """
+    value = f"{date_modified.isoformat()} {pk}"
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_change_cursor(token: str) -> Tuple[datetime.datetime, str]:
+    """
+    Decode a continuation token into the date_modified and pk of a row.
+    """
+    try:
+        value = base64.urlsafe_b64decode(token.encode()).decode()
+        date_modified, _, pk = value.partition(" ")
+        return datetime.datetime.fromisoformat(date_modified), pk
+    except (ValueError, binascii.Error) as exc:
+        raise ValueError(f"Invalid change cursor: {token!r}") from exc
+
+
+class TimeStampedQuerySetMixin:
+    """
+    Keeps date_modified current on bulk updates, which bypass ``save()``, and
+    provides incremental reads of changed rows.
+    """
+
+    def update(self, **kwargs: Any) -> int:
+        kwargs.setdefault("date_modified", timezone.now())
+        return super().update(**kwargs)  # type: ignore[misc,no-any-return]
+
+    def bulk_update(
+        self,
+        objs: Iterable[Any],
+        fields: Iterable[str],
+        batch_size: Optional[int] = None,
+    ) -> int:
+        objs = tuple(objs)
+        fields = list(fields)
+        if "date_modified" not in fields:
+            now = timezone.now()
+            for obj in objs:
+                obj.date_modified = now
+            fields.append("date_modified")
+        return super().bulk_update(  # type: ignore[misc,no-any-return]
+            objs, fields, batch_size=batch_size
+        )
+
+    def changed_since(
+        self, timestamp: datetime.datetime, cursor: Optional[str] = None
+    ) -> "models.QuerySet[models.Model]":
+        """
+        Return rows modified at or after ``timestamp``, ordered by
+        ``(date_modified, pk)``.
+
+        Continue reading after the last seen row by passing the token from
+        ``change_cursor(row)`` as ``cursor``. Unlike an offset, the token stays
+        correct while rows are modified and when many rows share the same
+        date_modified. Rows without date_modified are never returned.
+
+        For this to read only the changed rows, add a composite index to the
+        model: ``models.Index(fields=["date_modified", "id"], name=...)``.
+
+        :param timestamp: Return rows modified at or after this time
+        :param cursor: Token of the last row read, to continue after
+        :return: Ordered queryset of changed rows
+        """
+        queryset = cast("models.QuerySet[models.Model]", self)
+        queryset = queryset.filter(date_modified__gte=timestamp)
+        if cursor is not None:
+            date_modified, pk = decode_change_cursor(cursor)
+            queryset = queryset.filter(
+                Q(date_modified__gt=date_modified)
+                | Q(date_modified=date_modified, pk__gt=pk)
+            )
+        return queryset.order_by("date_modified", "pk")  # type: ignore[no-any-return]
+
+    def change_cursor(self, row: Union[models.Model, Mapping[str, Any]]) -> str:
+        """
+        Return the ``changed_since`` continuation token of a row.
+
+        :param row: Model instance, or .dicts()/.values() row including
+          date_modified and the primary key
+        :return: Continuation token
+        """
+        if isinstance(row, models.Model):
+            date_modified, pk = row.date_modified, row.pk  # type: ignore[attr-defined]
+        else:
+            meta = cast("models.QuerySet[models.Model]", self).model._meta
+            pk_name = "pk" if "pk" in row else meta.pk.attname
+            date_modified, pk = row["date_modified"], row[pk_name]
+        return encode_change_cursor(date_modified, pk)
+
+
+class TimeStampedQuerySet(TimeStampedQuerySetMixin, models.QuerySet):
+    pass
+
+
+TimeStampedManager = models.Manager.from_queryset(TimeStampedQuerySet)
+
+
 class TimeStampedModel(models.Model):
     """
     Provides automatic date_created and date_modified fields.
@@ -161,6 +417,222 @@ class TimeStampedModel(models.Model):
         super().save(*args, **kwargs)
 
 
+class VersionedQuerySetMixin:
+    """
+    Increments version on bulk updates, which bypass ``save()``.
+    """
+
+    def update(self, **kwargs: Any) -> int:
+        kwargs.setdefault("version", F("version") + 1)
+        return super().update(**kwargs)  # type: ignore[misc,no-any-return]
+
+    def bulk_update(
+        self,
+        objs: Iterable[Any],
+        fields: Iterable[str],
+        batch_size: Optional[int] = None,
+    ) -> int:
+        objs = tuple(objs)
+        fields = list(fields)
+        if "version" in fields:
+            return super().bulk_update(  # type: ignore[misc,no-any-return]
+                objs, fields, batch_size=batch_size
+            )
+
+        for obj in objs:
+            obj.version = F("version") + 1
+        fields.append("version")
+        updated = super().bulk_update(  # type: ignore[misc]
+            objs, fields, batch_size=batch_size
+        )
+
+        # Read back the incremented versions, they may have been bumped
+        # concurrently as well
+        queryset = cast("models.QuerySet[models.Model]", self)
+        versions = dict(
+            queryset.filter(pk__in=[obj.pk for obj in objs]).values_list(
+                "pk", "version"
+            )
+        )
+        for obj in objs:
+            obj.version = versions.get(obj.pk)
+        return updated  # type: ignore[no-any-return]
+
+
+class VersionedQuerySet(VersionedQuerySetMixin, models.QuerySet):
+    pass
+
+
+VersionedManager = models.Manager.from_queryset(VersionedQuerySet)
+
+
+class VersionedModel(models.Model):
+    """
+    Provides a version field, incremented in the database on every update.
+
+    Unlike date_modified, the version tells apart any two updates, however
+    close in time, which makes it an exact optimistic concurrency token.
+    """
+
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name=_("version"),
+    )
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        # Saving no fields stays a no-op
+        update_fields = kwargs.get("update_fields")
+        if update_fields and "version" not in update_fields:
+            kwargs["update_fields"] = [*update_fields, "version"]
+        super().save(*args, **kwargs)
+
+    def _do_update(
+        self,
+        base_qs: "models.QuerySet[Any]",
+        using: Optional[str],
+        pk_val: Any,
+        values: Iterable[Tuple[Any, Any, Any]],
+        *args: Any,
+        **kwargs: Any,
+    ) -> Any:
+        # Only updates increment the version, inserts save it as is
+        field: Any = self._meta.get_field("version")
+        values = [value for value in values if value[0] is not field]
+        version = self.version
+
+        # Swapping the loaded version for the next one tells the new version
+        # without reading it back
+        updated = super()._do_update(
+            base_qs.filter(version=version),
+            using,
+            pk_val,
+            [*values, (field, None, version + 1)],
+            *args,
+            **kwargs,
+        )
+        if updated:
+            self.version = version + 1
+            return updated
+
+        # Either updated concurrently since loaded, or missing
+        updated = super()._do_update(
+            base_qs,
+            using,
+            pk_val,
+            [*values, (field, None, F("version") + 1)],
+            *args,
+            **kwargs,
+        )
+        if updated:
+            self.version = (
+                base_qs.filter(pk=pk_val).values_list("version", flat=True).get()
+            )
+        return updated
+
+
+class FieldVersionedQuerySetMixin(VersionedQuerySetMixin):
+    """
+    Marks the changed fields of bulk updated rows as unknown, as bulk updates
+    can't record the version of each row.
+    """
+
+    def update(self, **kwargs: Any) -> int:
+        kwargs.setdefault("field_versions", None)
+        return super().update(**kwargs)
+
+    def bulk_update(
+        self,
+        objs: Iterable[Any],
+        fields: Iterable[str],
+        batch_size: Optional[int] = None,
+    ) -> int:
+        objs = tuple(objs)
+        fields = list(fields)
+        if "field_versions" not in fields:
+            for obj in objs:
+                obj.field_versions = None
+            fields.append("field_versions")
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+
+class FieldVersionedQuerySet(FieldVersionedQuerySetMixin, models.QuerySet):
+    pass
+
+
+FieldVersionedManager = models.Manager.from_queryset(FieldVersionedQuerySet)
+
+
+class FieldVersionedModel(VersionedModel):
+    """
+    Also records the version at which each field last changed, telling
+    whether an update based on an older version touches changed fields.
+
+    ``field_versions`` maps field names to versions, with ``"*"`` holding the
+    version up to which any field may have changed. It's reset to null by bulk
+    updates, in which case any field may have changed up to the current
+    version.
+    """
+
+    field_versions = models.JSONField(
+        blank=True,
+        null=True,
+        default=dict,
+        editable=False,
+        verbose_name=_("field versions"),
+    )
+
+    class Meta:
+        abstract = True
+
+    def get_field_version(self, name: str) -> int:
+        if self.field_versions is None:
+            return self.version
+        return int(self.field_versions.get(name, self.field_versions.get("*", 0)))
+
+    def get_changed_fields(self, version: int, names: Iterable[str]) -> List[str]:
+        """
+        Get the fields changed since a version, out of the given fields.
+        """
+        return [name for name in names if self.get_field_version(name) > version]
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+
+        # Without update_fields, any field may have changed
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            changed = {field.name for field in self._meta.concrete_fields}
+        elif not update_fields:
+            # Saving no fields stays a no-op
+            return
+        else:
+            changed = {self._meta.get_field(name).name for name in update_fields}
+        changed -= {self._meta.pk.name, "version", "field_versions"}
+
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        queryset = type(self)._base_manager.using(using)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            # The row is locked by the update, read and merge what other
+            # updates recorded
+            field_versions = (
+                queryset.filter(pk=self.pk)
+                .values_list("field_versions", flat=True)
+                .get()
+            )
+            if field_versions is None:
+                field_versions = {"*": self.version - 1}
+            field_versions.update(dict.fromkeys(changed, self.version))
+            queryset.filter(pk=self.pk).update(field_versions=field_versions)
+        self.field_versions = field_versions
+
+
 class UUIDModel(models.Model):
     """
     Provides auto-generating UUIDField as the primary key for a model.
@@ -172,6 +644,68 @@ class UUIDModel(models.Model):
         abstract = True
 
 
+_uuid7_lock = threading.Lock()
+_uuid7_last_ms = 0
+_uuid7_counter = 0
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Generate a time-ordered version 7 UUID, as specified by RFC 9562.
+
+    Bits are laid out as a 48 bit unix timestamp in milliseconds, a 42 bit
+    counter split by the version and variant bits, and 32 random bits. The
+    counter is randomly seeded each millisecond and incremented within it,
+    making UUIDs monotonic within the process.
+    """
+    global _uuid7_last_ms, _uuid7_counter
+
+    with _uuid7_lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _uuid7_last_ms:
+            # Seed below the counter's top bit, leaving room for increments
+            _uuid7_counter = int.from_bytes(os.urandom(6), "big") >> 7
+        else:
+            # Same millisecond or clock moved backwards
+            ms = _uuid7_last_ms
+            _uuid7_counter += 1
+            if _uuid7_counter >> 42:
+                # Counter overflow, borrow from the next millisecond
+                ms += 1
+                _uuid7_counter = 0
+        _uuid7_last_ms = ms
+        counter = _uuid7_counter
+
+    random = int.from_bytes(os.urandom(4), "big")
+    value = (
+        (ms & 0xFFFF_FFFF_FFFF) << 80
+        | 0x7 << 76
+        | (counter >> 30) << 64
+        | 0b10 << 62
+        | (counter & 0x3FFF_FFFF) << 32
+        | random
+    )
+    return uuid.UUID(int=value)
+
+
+class TimeOrderedUUIDModel(models.Model):
+    """
+    Provides auto-generating UUIDField as the primary key for a model, using
+    time-ordered version 7 UUIDs.
+
+    Unlike random version 4 UUIDs, new keys are appended to the end of the
+    primary key index, keeping inserts fast and the index compact.
+    """
+
+    id = models.UUIDField(primary_key=True, editable=False, default=uuid7)
+
+    class Meta:
+        abstract = True
+
+
+_pregenerated_secrets = threading.local()
+
+
 class SecretField(models.CharField):
     description = _("Generates and stores a random key.")
 
@@ -224,7 +758,8 @@ class SecretField(models.CharField):
 
     def pre_save(self, model_instance: models.Model, add: bool) -> Any:
         if self.auto and add:
-            value = self.get_random_str()
+            pregenerated = getattr(_pregenerated_secrets, "values", {}).get(self)
+            value = pregenerated.pop() if pregenerated else self.get_random_str()
             setattr(model_instance, self.attname, value)
             return value
         else:
@@ -235,6 +770,50 @@ class SecretField(models.CharField):
         self._check_random_bytes(random)
         return binascii.hexlify(random).decode("utf8")
 
+    def generate_many(self, n: int) -> List[str]:
+        """
+        Generate ``n`` random strings, drawing the random bytes for all of them
+        with a single ``os.urandom`` call and encoding them in one go.
+
+        Falls back to calling ``get_random_str`` ``n`` times when
+        ``get_random_bytes`` is overridden.
+        """
+        if type(self).get_random_bytes is not SecretField.get_random_bytes:
+            return [self.get_random_str() for _ in range(n)]
+        if n < 1:
+            return []
+
+        random = os.urandom(self.num_bytes * n)
+        self._check_random_bytes(random[: self.num_bytes])
+        return self.encode_many(random, n)
+
+    def encode_many(self, random: bytes, n: int) -> List[str]:
+        """
+        Encode ``n`` concatenated random values of ``num_bytes`` each.
+        """
+        encoded = binascii.hexlify(random).decode("utf8")
+        length = self.num_bytes * 2
+        return [encoded[i : i + length] for i in range(0, length * n, length)]
+
+    @contextmanager
+    def pregenerate(self, n: int) -> Iterator[None]:
+        """
+        Generate values for ``n`` rows up front, used by ``pre_save`` for rows
+        added by the current thread within the block, e.g. by ``bulk_create``.
+        """
+        values = getattr(_pregenerated_secrets, "values", None)
+        if values is None:
+            values = _pregenerated_secrets.values = {}
+        previous = values.get(self)
+        values[self] = self.generate_many(n) if self.auto else []
+        try:
+            yield
+        finally:
+            if previous is None:
+                del values[self]
+            else:
+                values[self] = previous
+
     def _check_random_bytes(self, random: Optional[Sized]) -> None:
         if random is None:
             raise ValidationError(
@@ -254,6 +833,25 @@ class SecretField(models.CharField):
         return os.urandom(self.num_bytes)
 
 
+class SecretQuerySetMixin:
+    """
+    Generates the values of auto SecretFields for all rows of a
+    ``bulk_create`` at once.
+    """
+
+    def bulk_create(self, objs: Iterable[Any], *args: Any, **kwargs: Any) -> Any:
+        objs = list(objs)
+        model = cast("models.QuerySet[models.Model]", self).model
+        with ExitStack() as stack:
+            for field in model._meta.concrete_fields:
+                if isinstance(field, SecretField) and field.auto:
+                    stack.enter_context(field.pregenerate(len(objs)))
+            return super().bulk_create(objs, *args, **kwargs)  # type: ignore[misc]
+
+
+_Y64_TABLE: Final = bytes.maketrans(b"+/=", b"._-")
+
+
 class URLSecretField(SecretField):
     @staticmethod
     def get_field_length(num_bytes: int) -> int:
@@ -277,9 +875,21 @@ class URLSecretField(SecretField):
         ``{"+", "/", "="} => {".", "_", "-"}``.
         """
         first_pass = base64.urlsafe_b64encode(s)
-        return first_pass.translate(bytes.maketrans(b"+/=", b"._-"))
+        return first_pass.translate(_Y64_TABLE)
 
     def get_random_str(self) -> str:
         random = self.get_random_bytes()
         self._check_random_bytes(random)
         return self.y64_encode(random).decode("utf-8")
+
+    def encode_many(self, random: bytes, n: int) -> List[str]:
+        size = self.num_bytes
+        if size % 3:
+            # Padded values can't be encoded together
+            return [
+                self.y64_encode(random[i : i + size]).decode("utf-8")
+                for i in range(0, size * n, size)
+            ]
+        encoded = self.y64_encode(random).decode("utf-8")
+        length = size // 3 * 4
+        return [encoded[i : i + length] for i in range(0, length * n, length)]
@@ -1,25 +1,45 @@
+import datetime
+import hashlib
+import heapq
 import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import (
     TYPE_CHECKING,
     Any,
+    Deque,
+    Final,
     Generic,
     Iterable,
     Iterator,
     List,
     Mapping,
+    NamedTuple,
     Optional,
+    Sequence,
+    Tuple,
     Type,
     TypeVar,
     Union,
     cast,
 )
 
-from django.db.models import Model
-from django.db.models.expressions import Combinable
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import DatabaseError, connections
+from django.db.models import F, Model
+from django.db.models.expressions import Combinable, OrderBy
 from django.db.models.query import QuerySet
+from django.db.models.sql.constants import GET_ITERATOR_CHUNK_SIZE
+from django.utils import timezone
+from django.utils.connection import ConnectionDoesNotExist
 from typing_extensions import Protocol
 
-from .models import ModelDict
+from .models import FrozenModelDict, ModelDict
+from .tenants import tenant_databases
 
 if TYPE_CHECKING:
     from django.db.models.query import _QuerySet
@@ -29,15 +49,131 @@ _log = logging.getLogger(__name__)
 T = TypeVar("T", bound="QuerySet[Model]")
 
 
+class SlowQuery(NamedTuple):
+    using: str
+    sql: str
+    params_fingerprint: str
+    duration: float
+    plan: Optional[str]
+    timestamp: datetime.datetime
+
+
+class SlowQueryLog:
+    """
+    Bounded in-memory log of .dicts() queries that took longer than
+    ``settings.BANANAS_SLOW_QUERY_THRESHOLD`` seconds to fetch.
+
+    Holds the ``settings.BANANAS_SLOW_QUERY_LOG_SIZE`` latest queries,
+    captured by the current process.
+    """
+
+    def __init__(self) -> None:
+        self._queries: Deque[SlowQuery] = deque(maxlen=self.get_size())
+
+    @staticmethod
+    def get_threshold() -> Optional[float]:
+        return getattr(settings, "BANANAS_SLOW_QUERY_THRESHOLD", None)
+
+    @staticmethod
+    def get_size() -> int:
+        return getattr(settings, "BANANAS_SLOW_QUERY_LOG_SIZE", 100)
+
+    def __iter__(self) -> Iterator[SlowQuery]:
+        return iter(list(self._queries))
+
+    def __len__(self) -> int:
+        return len(self._queries)
+
+    def clear(self) -> None:
+        self._queries.clear()
+
+    def record(self, queryset: "QuerySet[Any]", duration: float) -> None:
+        """
+        Explain and store a slow queryset.
+
+        :param queryset: The slow queryset
+        :param duration: Seconds spent fetching the queryset rows
+        """
+        try:
+            sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+        except EmptyResultSet:
+            # Nothing was queried, i.e. filtering on an empty list
+            return
+        fingerprint = hashlib.blake2b(repr(params).encode(), digest_size=8)
+
+        plan: Optional[str]
+        try:
+            plan = queryset.explain()
+        except (DatabaseError, EmptyResultSet):
+            _log.warning("Unable to explain slow query: %s", sql, exc_info=True)
+            plan = None
+
+        size = self.get_size()
+        if self._queries.maxlen != size:
+            self._queries = deque(self._queries, maxlen=size)
+
+        self._queries.append(
+            SlowQuery(
+                using=queryset.db,
+                sql=sql,
+                params_fingerprint=fingerprint.hexdigest(),
+                duration=duration,
+                plan=plan,
+                timestamp=timezone.now(),
+            )
+        )
+
+
+slow_queries = SlowQueryLog()
+
+
 class ModelDictIterable:
-    def __init__(self, queryset: T) -> None:
+    dict_class: Type[ModelDict] = ModelDict
+
+    def __init__(
+        self,
+        queryset: T,
+        chunked_fetch: bool = False,
+        chunk_size: int = GET_ITERATOR_CHUNK_SIZE,
+    ) -> None:
         self.queryset = queryset
+        self.chunked_fetch = chunked_fetch
+        self.chunk_size = chunk_size
         self.named_fields: Mapping[str, str] = self.queryset._hints.get("_named_fields")  # type: ignore[attr-defined]
 
     def __iter__(self) -> Iterator[ModelDict]:
         queryset = self.queryset
-        query = queryset.query
-        compiler = query.get_compiler(queryset.db)
+        compiler = queryset.query.get_compiler(queryset.db)
+        names = self.get_names()
+        dict_class = self.dict_class
+        rows = compiler.results_iter(
+            chunked_fetch=self.chunked_fetch, chunk_size=self.chunk_size
+        )
+
+        threshold = slow_queries.get_threshold()
+        if threshold is None:
+            for row in rows:
+                yield dict_class(zip(names, row))
+            return
+
+        # Only time spent fetching rows counts, not time spent by the consumer
+        duration = 0.0
+        rows = iter(rows)
+        while True:
+            start = time.perf_counter()
+            try:
+                row = next(rows)
+            except StopIteration:
+                break
+            finally:
+                duration += time.perf_counter() - start
+            yield dict_class(zip(names, row))
+
+        if duration >= threshold:
+            slow_queries.record(queryset, duration)
+
+    def get_names(self) -> List[str]:
+        query = self.queryset.query
 
         if hasattr(query, "selected") and query.selected:
             names = list(query.selected)
@@ -52,8 +188,7 @@ class ModelDictIterable:
         if self.named_fields:
             names = self.rename_fields(names)
 
-        for row in compiler.results_iter():
-            yield ModelDict(zip(names, row))
+        return names
 
     def rename_fields(self, names: Iterable[str]) -> List[str]:
         named_fields = {value: key for key, value in self.named_fields.items()}
@@ -61,6 +196,10 @@ class ModelDictIterable:
         return names
 
 
+class FrozenModelDictIterable(ModelDictIterable):
+    dict_class = FrozenModelDict
+
+
 _MT_co = TypeVar("_MT_co", bound=Model, covariant=True)
 
 
@@ -69,16 +208,22 @@ class IsQuerySet(Protocol[_MT_co]):
         self, *fields: Union[str, Combinable], **expressions: Any
     ) -> "_QuerySet[_MT_co, dict[str, Any]]": ...
 
+    def using(self, alias: Optional[str]) -> "_QuerySet[_MT_co, Any]": ...
+
 
 class ModelDictQuerySetMixin:
     def dicts(
-        self: IsQuerySet[_MT_co], *fields: str, **named_fields: str
+        self: IsQuerySet[_MT_co],
+        *fields: str,
+        frozen: bool = False,
+        **named_fields: str,
     ) -> "_QuerySet[_MT_co, ModelDict]":
         if named_fields:
             fields += tuple(named_fields.values())
 
         clone = cast("_QuerySet[_MT_co, ModelDict]", self.values(*fields))
-        clone._iterable_class = ModelDictIterable  # type: ignore[assignment]
+        iterable_class = FrozenModelDictIterable if frozen else ModelDictIterable
+        clone._iterable_class = iterable_class  # type: ignore[assignment]
 
         # QuerySet._hints is a dict object used by db router
         # to aid deciding which db should get a request. Currently
@@ -90,6 +235,13 @@ class ModelDictQuerySetMixin:
 
         return clone
 
+    def using_url(self: IsQuerySet[_MT_co], url: str) -> "_QuerySet[_MT_co, Any]":
+        """
+        Select the database by URL, adding it to the tenant databases on first
+        use.
+        """
+        return self.using(tenant_databases.get_alias(url))
+
 
 _MT = TypeVar("_MT", bound=Model)
 
@@ -117,14 +269,277 @@ class IsManager(Protocol[_MT]):
 
 class ModelDictManagerMixin:
     def dicts(
-        self, *fields: str, **named_fields: str
+        self, *fields: str, frozen: bool = False, **named_fields: str
     ) -> "_QuerySet[_MT_co, ModelDict]":
         # Mypy: `self` types don't add up
         queryset = self.get_queryset()  # type: ignore[misc]
-        return queryset.dicts(*fields, **named_fields)
+        return queryset.dicts(*fields, frozen=frozen, **named_fields)
+
+    def using_url(self, url: str) -> "QuerySet[Any]":
+        # Mypy: `self` types don't add up
+        queryset = self.get_queryset()  # type: ignore[misc]
+        return queryset.using_url(url)
 
     def get_queryset(self: IsManager[_MT]) -> ModelDictQuerySet:
         return ModelDictQuerySet(self.model, using=self._db)
 
 
 ExtendedQuerySet = ModelDictQuerySet  # Left for compatibility
+
+
+class _Done: ...
+
+
+_DONE: Final = _Done()
+
+
+class OrderKey:
+    """
+    Sort key comparing row values in mixed directions, with nulls sorting
+    first or last per value.
+    """
+
+    __slots__ = ("descending", "nulls_first", "values")
+
+    def __init__(
+        self,
+        values: Sequence[Any],
+        descending: Sequence[bool],
+        nulls_first: Sequence[bool],
+    ) -> None:
+        self.values = values
+        self.descending = descending
+        self.nulls_first = nulls_first
+
+    def __lt__(self, other: "OrderKey") -> bool:
+        for value, other_value, descending, nulls_first in zip(
+            self.values, other.values, self.descending, self.nulls_first
+        ):
+            if value == other_value:
+                continue
+            if value is None:
+                return nulls_first
+            if other_value is None:
+                return not nulls_first
+            return bool(value > other_value if descending else value < other_value)
+        return False
+
+
+def get_ordering(queryset: "QuerySet[Any]") -> List[Tuple[str, bool, Optional[bool]]]:
+    """
+    Return the (row key, descending, nulls first) triples that a .dicts()
+    queryset is ordered by, where nulls first is None unless explicitly set by
+    ordering on ``F(...).asc(nulls_first=True)`` or alike.
+
+    :param queryset: A queryset returned from .dicts()
+    :return: List of row keys, their sort direction and placement of nulls
+    """
+    query = queryset.query
+    if query.order_by:
+        ordering: Sequence[Any] = query.order_by
+    elif query.default_ordering and query.get_meta().ordering:
+        ordering = cast(Sequence[Any], query.get_meta().ordering)
+    else:
+        return []
+
+    names = ModelDictIterable(queryset).get_names()
+    named_fields = queryset._hints.get("_named_fields") or {}  # type: ignore[attr-defined]
+    renamed = {value: key for key, value in named_fields.items()}
+    pk_name = query.get_meta().pk.attname
+
+    keys = []
+    for field in ordering:
+        nulls_first: Optional[bool] = None
+        if isinstance(field, OrderBy) and isinstance(field.expression, F):
+            descending = field.descending
+            name = field.expression.name  # type: ignore[attr-defined]
+            if field.nulls_first:
+                nulls_first = True
+            elif field.nulls_last:
+                nulls_first = False
+        elif isinstance(field, F):
+            descending = False
+            name = field.name  # type: ignore[attr-defined]
+        elif isinstance(field, str) and field != "?":
+            descending = field.startswith("-")
+            name = field.lstrip("-+")
+        else:
+            raise ValueError(f"Can not merge rows ordered by {field!r}")
+        name = renamed.get(name, name)
+        if name == "pk" and name not in names:
+            name = pk_name
+        if name not in names:
+            raise ValueError(
+                f"Can not merge rows ordered by {field!r}, include it in .dicts()"
+            )
+        keys.append((name, descending, nulls_first))
+
+    return keys
+
+
+def get_nulls_first(
+    ordering: Sequence[Tuple[str, bool, Optional[bool]]], using: Sequence[str]
+) -> List[bool]:
+    """
+    Return whether nulls sort first for each key of an ordering, as the
+    databases of the given aliases sort them unless explicitly set.
+    """
+    nulls_largest = {connections[alias].features.nulls_order_largest for alias in using}
+    nulls_first = []
+    for name, descending, first in ordering:
+        if first is None:
+            if len(nulls_largest) > 1:
+                raise ValueError(
+                    f"Can not merge rows ordered by {name!r} from databases "
+                    "sorting nulls differently, set nulls_first or nulls_last"
+                )
+            # Nulls sort first descending where they're the largest values
+            first = descending == next(iter(nulls_largest), True)
+        nulls_first.append(first)
+    return nulls_first
+
+
+def _put(rows: "queue.Queue[Any]", item: Any, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            rows.put(item, timeout=0.1)
+        except queue.Full:
+            continue
+        return True
+    return False
+
+
+def _produce(
+    queryset: "QuerySet[Any]",
+    using: str,
+    rows: "queue.Queue[Any]",
+    stop: threading.Event,
+    chunk_size: int,
+) -> None:
+    try:
+        for row in queryset.using(using).iterator(chunk_size=chunk_size):
+            if not _put(rows, row, stop):
+                return
+        _put(rows, _DONE, stop)
+    except Exception as exc:
+        _put(rows, exc, stop)
+    finally:
+        # Connections are thread local, don't leave this thread's one open
+        connections[using].close()
+
+
+def _consume(rows: "queue.Queue[Any]", producers: int) -> Iterator[ModelDict]:
+    while producers:
+        row = rows.get()
+        if row is _DONE:
+            producers -= 1
+        elif isinstance(row, Exception):
+            raise row
+        else:
+            yield row
+
+
+def fan_out(
+    queryset: "_QuerySet[Any, ModelDict]",
+    using: Sequence[str],
+    *,
+    ordered: Optional[bool] = None,
+    buffer_size: int = 100,
+) -> Iterator[ModelDict]:
+    """
+    Run a .dicts() queryset against several database aliases concurrently
+    and merge the resulting rows into one stream.
+
+    Rows are streamed from each database in a separate thread, holding at most
+    ``buffer_size`` rows per database in memory. Ordered querysets are heap
+    merged on their ordering, unordered querysets are interleaved as rows
+    arrive.
+
+    :param queryset: A queryset returned from .dicts()
+    :param using: Database aliases to run the queryset against
+    :param ordered: Merge on ordering, defaults to ``queryset.ordered``
+    :param buffer_size: Max number of buffered rows per database
+    :return: Iterator of merged rows
+    """
+    if not issubclass(cast(type, queryset._iterable_class), ModelDictIterable):
+        raise ValueError("fan_out() expects a queryset returned from .dicts()")
+
+    for alias in using:
+        if alias not in connections.settings:
+            raise ConnectionDoesNotExist(f"The connection '{alias}' doesn't exist.")
+
+    if ordered is None:
+        ordered = queryset.ordered
+    ordering = get_ordering(queryset) if ordered else []
+    if ordered and not ordering:
+        raise ValueError("Can not merge rows of an unordered queryset")
+    nulls_first = get_nulls_first(ordering, using)
+
+    stop = threading.Event()
+    queues: List[queue.Queue[Any]]
+    if ordered:
+        queues = [queue.Queue(maxsize=buffer_size) for _ in using]
+    else:
+        queues = [queue.Queue(maxsize=buffer_size * len(using))] * len(using)
+
+    threads = [
+        threading.Thread(
+            target=_produce,
+            args=(queryset, alias, rows, stop, buffer_size),
+            daemon=True,
+        )
+        for alias, rows in zip(using, queues)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        if ordered:
+            names = [name for name, _, _ in ordering]
+            descending = [desc for _, desc, _ in ordering]
+            yield from heapq.merge(
+                *(_consume(rows, 1) for rows in queues),
+                key=lambda row: OrderKey(
+                    [row[name] for name in names], descending, nulls_first
+                ),
+            )
+        else:
+            yield from _consume(queues[0], len(using))
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+def _evaluate(queryset: "QuerySet[Any]") -> List[Any]:
+    try:
+        return list(queryset)
+    finally:
+        # Connections are thread local, don't leave this thread's one open
+        connections[queryset.db].close()
+
+
+def gather(
+    *querysets: "QuerySet[Any]", max_workers: Optional[int] = None
+) -> List[List[Any]]:
+    """
+    Evaluate independent querysets concurrently, each on its own connection.
+
+    Querysets are evaluated in a thread pool, so they can't see uncommitted
+    changes made in the calling thread's transaction.
+
+    :param querysets: Querysets to evaluate
+    :param max_workers: Max number of threads, defaults to one per queryset
+    :return: List of results, in the same order as the given querysets
+
+    Example:
+    >>> books, authors = gather(  # doctest: +SKIP
+    ...     Book.objects.dicts("id", "title"),
+    ...     Author.objects.dicts("id", "name"),
+    ... )
+    """
+    if not querysets:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(querysets)) as executor:
+        return list(executor.map(_evaluate, querysets))
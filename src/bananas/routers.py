@@ -0,0 +1,105 @@
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, ClassVar, Dict, Iterator, List, Optional, Type
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import models
+
+_use_primary: ContextVar[bool] = ContextVar("bananas_use_primary", default=False)
+_wrote: ContextVar[bool] = ContextVar("bananas_wrote", default=False)
+
+
+def reset_primary(**kwargs: Any) -> None:
+    """
+    Let reads go to replicas again, called at the start of every request.
+    """
+    _wrote.set(False)
+
+
+request_started.connect(reset_primary, dispatch_uid="bananas.routers.reset_primary")
+
+
+@contextmanager
+def use_primary() -> Iterator[None]:
+    """
+    Route all reads within the block to the primary database.
+    """
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+@contextmanager
+def sticky_scope() -> Iterator[None]:
+    """
+    Scope sticking reads to the primary after a write to the block, like a
+    request does, for code running outside of requests such as tasks or
+    management commands.
+    """
+    token = _wrote.set(False)
+    try:
+        yield
+    finally:
+        _wrote.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Database router sending writes to the primary database and reads to its
+    replicas round-robin.
+
+    Replicas are the databases mirroring the primary in tests, as configured
+    by ``bananas.url.databases_from_urls``, unless ``replicas`` is set. Once
+    something has been written, reads stick to the primary for the rest of the
+    request, or ``sticky_scope``, so that they never miss that write because
+    of replication lag.
+    """
+
+    primary: ClassVar[str] = "default"
+    replicas: ClassVar[Optional[List[str]]] = None
+
+    def __init__(self) -> None:
+        self._counter = itertools.count()
+
+    def get_replicas(self) -> List[str]:
+        if self.replicas is not None:
+            return self.replicas
+        databases: Dict[str, Dict[str, Any]] = settings.DATABASES
+        return [
+            alias
+            for alias, conf in databases.items()
+            if conf.get("TEST", {}).get("MIRROR") == self.primary
+        ]
+
+    def db_for_read(self, model: Type[models.Model], **hints: Any) -> str:
+        replicas = self.get_replicas()
+        if not replicas or _use_primary.get() or _wrote.get():
+            return self.primary
+        return replicas[next(self._counter) % len(replicas)]
+
+    def db_for_write(self, model: Type[models.Model], **hints: Any) -> str:
+        _wrote.set(True)
+        return self.primary
+
+    def allow_relation(
+        self, obj1: models.Model, obj2: models.Model, **hints: Any
+    ) -> Optional[bool]:
+        databases = {self.primary, *self.get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(
+        self,
+        db: str,
+        app_label: str,
+        model_name: Optional[str] = None,
+        **hints: Any,
+    ) -> Optional[bool]:
+        if db in self.get_replicas():
+            return False
+        return None
@@ -1,11 +1,14 @@
 import os
-from typing import Final, Optional
+import threading
+import time
+from typing import Dict, Final, Optional, Tuple
 
 from typing_extensions import overload
 
 from .environment import env
 
 BANANAS_SECRETS_DIR_ENV_KEY: Final = "BANANAS_SECRETS_DIR"
+BANANAS_SECRETS_CHECK_INTERVAL_ENV_KEY: Final = "BANANAS_SECRETS_CHECK_INTERVAL"
 
 
 @overload
@@ -38,3 +41,99 @@ def get_secrets_dir() -> str:
     Returns path to secrets directory
     """
     return env.get(BANANAS_SECRETS_DIR_ENV_KEY, "/run/secrets/")
+
+
+_Signature = Dict[str, Tuple[int, int, int]]
+
+
+def _stat(path: str) -> Tuple[int, int, int]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return (0, 0, 0)
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+class SecretsStore:
+    """
+    Caching reader of the secret files in BANANAS_SECRETS_DIR.
+
+    All secrets are read at once, and read again when the directory or any of
+    its files has changed inode, modification time or size, checked at most
+    every ``check_interval`` seconds. This notices rotated secrets, including
+    Kubernetes secret volumes where files are symlinks swapped on update.
+    """
+
+    def __init__(self, check_interval: Optional[float] = None) -> None:
+        if check_interval is None:
+            check_interval = env.get_int(BANANAS_SECRETS_CHECK_INTERVAL_ENV_KEY, 1)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._secrets_dir: Optional[str] = None
+        self._secrets: Dict[str, str] = {}
+        self._signature: _Signature = {}
+        self._checked_at = 0.0
+
+    @overload
+    def get(self, secret_name: str, default: str) -> str: ...
+
+    @overload
+    def get(self, secret_name: str) -> Optional[str]: ...
+
+    def get(self, secret_name: str, default: Optional[str] = None) -> Optional[str]:
+        """
+        Gets contents of secret file, from memory
+
+        :param secret_name: The name of the secret present in BANANAS_SECRETS_DIR
+        :param default: Default value to return if no secret was found
+        :return: The secret or default if not found
+        """
+        secrets_dir = get_secrets_dir()
+        if (
+            secrets_dir != self._secrets_dir
+            or time.monotonic() - self._checked_at >= self.check_interval
+        ):
+            self._check(secrets_dir)
+        return self._secrets.get(secret_name, default)
+
+    def _check(self, secrets_dir: str) -> None:
+        with self._lock:
+            if secrets_dir != self._secrets_dir or self._signature != {
+                path: _stat(path) for path in self._signature
+            }:
+                self._load(secrets_dir)
+            self._checked_at = time.monotonic()
+
+    def _load(self, secrets_dir: str) -> None:
+        signature = {secrets_dir: _stat(secrets_dir)}
+        secrets = {}
+        try:
+            entries = list(os.scandir(secrets_dir))
+        except OSError:
+            entries = []
+
+        for entry in entries:
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                with open(entry.path) as secret_file:
+                    secrets[entry.name] = secret_file.read()
+            except OSError:
+                continue
+            signature[entry.path] = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        self._secrets_dir = secrets_dir
+        self._secrets = secrets
+        self._signature = signature
+
+    def refresh(self) -> None:
+        """
+        Read all secrets again, without waiting for a change to be noticed.
+        """
+        with self._lock:
+            self._load(get_secrets_dir())
+            self._checked_at = time.monotonic()
+
+
+secrets_store = SecretsStore()
@@ -1,7 +1,29 @@
+from typing import Any, Dict, List
+
 import bananas.environment
 
-ENV_SETTINGS = bananas.environment.get_settings()
+# Only read on import, values are parsed when first accessed
+_ENV_SETTINGS = list(bananas.environment.iter_env_settings())
+
+__all__: List[str] = sorted({name for name, _, _, _ in _ENV_SETTINGS})
+
+
+def __getattr__(name: str) -> Any:
+    value: Any
+    if name == "ENV_SETTINGS":
+        value = bananas.environment.parse_settings(_ENV_SETTINGS)
+    elif name in __all__:
+        env_settings = (setting for setting in _ENV_SETTINGS if setting[0] == name)
+        value = bananas.environment.parse_settings(env_settings)[name]
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted({*globals(), *__all__})
 
-__all__ = list(ENV_SETTINGS)
 
-locals().update(ENV_SETTINGS)
+ENV_SETTINGS: Dict[str, Any]
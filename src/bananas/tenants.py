@@ -0,0 +1,127 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Set
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .url import database_conf_from_url
+
+
+class TenantDatabaseRegistry:
+    """
+    Registry of databases added at runtime from database URLs, for tenants
+    that are too many to declare in ``settings.DATABASES``.
+
+    A database alias is added on first use of its URL and kept in a least
+    recently used set of ``settings.BANANAS_TENANT_DATABASES_SIZE`` aliases.
+    Evicted aliases are removed and their connections closed, at once in the
+    evicting thread and at the end of the next request in other threads.
+    Connections unused for ``settings.BANANAS_TENANT_DATABASES_IDLE_TIMEOUT``
+    seconds are closed at the end of requests as well.
+    """
+
+    prefix = "tenant_"
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._last_used: OrderedDict[str, float] = OrderedDict()
+        self._local = threading.local()
+
+    @staticmethod
+    def get_size() -> int:
+        return getattr(settings, "BANANAS_TENANT_DATABASES_SIZE", 64)
+
+    @staticmethod
+    def get_idle_timeout() -> Optional[float]:
+        return getattr(settings, "BANANAS_TENANT_DATABASES_IDLE_TIMEOUT", None)
+
+    def __contains__(self, alias: object) -> bool:
+        return alias in self._last_used
+
+    def __len__(self) -> int:
+        return len(self._last_used)
+
+    def get_alias(self, url: str) -> str:
+        """
+        Get the database alias of a database URL, adding it when missing.
+
+        :param url: Database URL
+        :return: Database alias
+        """
+        alias = self.prefix + hashlib.sha1(url.encode()).hexdigest()[:16]
+
+        with self._lock:
+            if alias in self._last_used:
+                self._last_used.move_to_end(alias)
+            else:
+                conf = database_conf_from_url(url)
+                conf = connections.configure_settings({DEFAULT_DB_ALIAS: conf})[
+                    DEFAULT_DB_ALIAS
+                ]
+                # Replace rather than mutate, other threads may be iterating
+                connections.settings = {**connections.settings, alias: conf}
+
+                while self._last_used and len(self._last_used) >= self.get_size():
+                    evicted, _ = self._last_used.popitem(last=False)
+                    self._remove(evicted)
+
+            self._last_used[alias] = time.monotonic()
+
+        self._get_used().add(alias)
+        return alias
+
+    def _get_used(self) -> Set[str]:
+        # Aliases used by the current thread, that may have open connections
+        used: Optional[Set[str]] = getattr(self._local, "used", None)
+        if used is None:
+            used = self._local.used = set()
+        return used
+
+    def _remove(self, alias: str) -> None:
+        self._close(alias)
+        connections.settings = {
+            key: conf for key, conf in connections.settings.items() if key != alias
+        }
+
+    @staticmethod
+    def _close(alias: str) -> None:
+        connection = getattr(
+            connections._connections, alias, None  # type: ignore[attr-defined]
+        )
+        if connection is not None:
+            connection.close()
+            del connections[alias]
+
+    def clear(self) -> None:
+        with self._lock:
+            for alias in self._last_used:
+                self._remove(alias)
+            self._last_used.clear()
+
+    def close_idle(self, **kwargs: Any) -> None:
+        """
+        Close the current thread's connections to evicted and idle tenant
+        databases, called at the end of every request.
+        """
+        idle_timeout = self.get_idle_timeout()
+        now = time.monotonic()
+
+        used = self._get_used()
+        for alias in list(used):
+            last_used = self._last_used.get(alias)
+            if last_used is None or (
+                idle_timeout is not None and now - last_used > idle_timeout
+            ):
+                self._close(alias)
+                used.discard(alias)
+
+
+tenant_databases = TenantDatabaseRegistry()
+
+request_finished.connect(
+    tenant_databases.close_idle, dispatch_uid="bananas.tenants.close_idle"
+)
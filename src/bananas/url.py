@@ -26,10 +26,84 @@ Currently supported engines are:
 
 You can add your own by running ``register(scheme, module_name)`` before
 parsing.
+
+================================================================================
+ Parameters
+================================================================================
+
+Query string parameters matching a Django database setting are parsed and set
+by ``database_conf_from_url``:
+
+=============================  ==============================================
+ Parameter                     Setting
+=============================  ==============================================
+ conn_max_age                  CONN_MAX_AGE, integer or "none" for unlimited
+ conn_health_checks            CONN_HEALTH_CHECKS
+ atomic_requests               ATOMIC_REQUESTS
+ autocommit                    AUTOCOMMIT
+ disable_server_side_cursors   DISABLE_SERVER_SIDE_CURSORS
+ time_zone                     TIME_ZONE
+ connect_timeout               OPTIONS["connect_timeout"]
+ sslmode                       OPTIONS["sslmode"]
+ application_name              OPTIONS["application_name"]
+ pool                          OPTIONS["pool"], psycopg 3 connection pool
+ pool_min_size                 OPTIONS["pool"]["min_size"]
+ pool_max_size                 OPTIONS["pool"]["max_size"]
+ pool_timeout                  OPTIONS["pool"]["timeout"]
+ pool_max_idle                 OPTIONS["pool"]["max_idle"]
+ pool_max_lifetime             OPTIONS["pool"]["max_lifetime"]
+=============================  ==============================================
+
+SQLite databases also take the pragmas ``journal_mode``, ``synchronous``,
+``mmap_size``, ``cache_size``, ``busy_timeout``, ``temp_store`` and
+``foreign_keys``, kept in ``PRAGMAS`` and applied on every new connection.
+
+Other parameters are left in ``PARAMS``.
+
+================================================================================
+ Caches
+================================================================================
+
+Cache configuration is parsed from URLs by ``cache_conf_from_url``, with the
+backends:
+
+==============================  ==================================================
+ URI scheme                     Backend
+==============================  ==================================================
+ locmem                         django.core.cache.backends.locmem.LocMemCache
+ dummy                          django.core.cache.backends.dummy.DummyCache
+ file, filebased                django.core.cache.backends.filebased.FileBasedCache
+ db, database                   django.core.cache.backends.db.DatabaseCache
+ memcached, pymemcache          django.core.cache.backends.memcached.PyMemcacheCache
+ pylibmc                        django.core.cache.backends.memcached.PyLibMCCache
+ redis, rediss                  django.core.cache.backends.redis.RedisCache
+==============================  ==================================================
+
+You can add your own by running ``register_cache_backend(scheme, backend)``
+before parsing.
 """
 
-from typing import Any, Dict, Final, List, Mapping, NamedTuple, Optional, Tuple, Union
-from urllib.parse import parse_qs, unquote_plus, urlsplit
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Final,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+from urllib.parse import parse_qs, unquote_plus, urlsplit, urlunsplit
+
+from django.db.backends.signals import connection_created
+
+from .environment import parse_bool, parse_int, parse_str
+
+if TYPE_CHECKING:
+    from django.db.backends.base.base import BaseDatabaseWrapper
 
 
 class Alias:
@@ -100,12 +174,15 @@ def resolve(
         raise KeyError("No matches for engine %s" % key) from exc
 
 
-def get_engine(scheme: str) -> str:
+def get_engine(
+    scheme: str, mapping: Mapping[str, _EngineReference] = ENGINE_MAPPING
+) -> str:
     """
     Perform a lookup in ENGINE_MAPPING using engine_string.
 
     :param scheme: '+'-separated string Maximum of 2 parts,
     i.e "postgres+psycopg" is OK, "postgres+psycopg2+postgis" is NOT OK.
+    :param mapping: Engine mapping to look in, defaults to ENGINE_MAPPING
     :return: Engine string
     """
     path = scheme.split("+")
@@ -115,7 +192,7 @@ def get_engine(scheme: str) -> str:
 
     engine: Union[str, List[Union[str, Dict[str, str]]], Dict[str, str]]
 
-    engine = resolve(ENGINE_MAPPING, first)
+    engine = resolve(mapping, first)
 
     # If the selected engine does not have a second level.
     if not isinstance(engine, list):
@@ -130,8 +207,7 @@ def get_engine(scheme: str) -> str:
     except ValueError as exc:
         # engine was not a list of length 2
         raise ValueError(
-            "django-bananas.url' engine "
-            "configuration is invalid: %r" % ENGINE_MAPPING
+            "django-bananas.url' engine configuration is invalid: %r" % mapping
         ) from exc
 
     assert isinstance(
@@ -181,6 +257,169 @@ def parse_path(path: str) -> Tuple[Optional[str], Optional[str]]:
     return database, schema
 
 
+def parse_optional_int(value: str) -> Optional[int]:
+    """
+    Parse an integer, where "none" means no limit, like unlimited persistent
+    connections for CONN_MAX_AGE or never expiring keys for a cache TIMEOUT.
+
+    :param value: Parameter value
+    :return: Number of seconds or None
+    """
+    if parse_str(value).lower() in ("none", "null"):
+        return None
+    return parse_int(value)
+
+
+_Parser = Callable[[str], Any]
+
+SETTING_PARAMS: Final[Dict[str, Tuple[str, _Parser]]] = {
+    "conn_max_age": ("CONN_MAX_AGE", parse_optional_int),
+    "conn_health_checks": ("CONN_HEALTH_CHECKS", parse_bool),
+    "atomic_requests": ("ATOMIC_REQUESTS", parse_bool),
+    "autocommit": ("AUTOCOMMIT", parse_bool),
+    "disable_server_side_cursors": ("DISABLE_SERVER_SIDE_CURSORS", parse_bool),
+    "time_zone": ("TIME_ZONE", parse_str),
+}
+
+OPTION_PARAMS: Final[Dict[str, Tuple[str, _Parser]]] = {
+    "connect_timeout": ("connect_timeout", parse_int),
+    "sslmode": ("sslmode", parse_str),
+    "application_name": ("application_name", parse_str),
+}
+
+POOL_PARAMS: Final[Dict[str, Tuple[str, _Parser]]] = {
+    "pool_min_size": ("min_size", parse_int),
+    "pool_max_size": ("max_size", parse_int),
+    "pool_timeout": ("timeout", parse_int),
+    "pool_max_idle": ("max_idle", parse_int),
+    "pool_max_lifetime": ("max_lifetime", parse_int),
+}
+
+
+def parse_pragma_keyword(value: str) -> str:
+    """
+    Parse a keyword pragma value, like the journal mode "wal".
+
+    :param value: Parameter value
+    :return: Lower case keyword
+    """
+    value = parse_str(value).lower()
+    if not value.isidentifier():
+        raise ValueError(f'Invalid pragma value "{value}"')
+    return value
+
+
+def parse_pragma_bool(value: str) -> str:
+    """
+    Parse a boolean pragma value.
+
+    :param value: Parameter value
+    :return: "on" or "off"
+    """
+    return "on" if parse_bool(value) else "off"
+
+
+SQLITE_ENGINES: Final = {
+    "django.db.backends.sqlite3",
+    "django.contrib.gis.db.backends.spatialite",
+}
+
+SQLITE_PRAGMA_PARAMS: Final[Dict[str, _Parser]] = {
+    "journal_mode": parse_pragma_keyword,
+    "synchronous": parse_pragma_keyword,
+    "mmap_size": parse_int,
+    "cache_size": parse_int,
+    "busy_timeout": parse_int,
+    "temp_store": parse_pragma_keyword,
+    "foreign_keys": parse_pragma_bool,
+}
+
+
+def parse_sqlite_pragmas(
+    params: Mapping[str, str],
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Split URL parameters into typed SQLite pragmas and remaining parameters.
+
+    :param params: URL query string parameters
+    :return: tuple with (pragmas, remaining params)
+
+    Example:
+    >>> parse_sqlite_pragmas({"journal_mode": "WAL", "mmap_size": "268435456"})
+    ({'journal_mode': 'wal', 'mmap_size': 268435456}, {})
+    """
+    pragmas: Dict[str, Any] = {}
+    remaining: Dict[str, str] = {}
+    for key, value in params.items():
+        if key in SQLITE_PRAGMA_PARAMS:
+            pragmas[key] = SQLITE_PRAGMA_PARAMS[key](value)
+        else:
+            remaining[key] = value
+    return pragmas, remaining
+
+
+def apply_sqlite_pragmas(
+    sender: Any, connection: "BaseDatabaseWrapper", **kwargs: Any
+) -> None:
+    """
+    Apply the ``PRAGMAS`` of a SQLite database configuration to a new
+    connection.
+    """
+    pragmas = connection.settings_dict.get("PRAGMAS")
+    if connection.vendor != "sqlite" or not pragmas:
+        return
+    for name, value in pragmas.items():
+        # Values are parsed as integers or identifiers and safe to inline
+        connection.connection.execute(f"PRAGMA {name} = {value}")
+
+
+connection_created.connect(
+    apply_sqlite_pragmas, dispatch_uid="bananas.url.apply_sqlite_pragmas"
+)
+
+
+def parse_params(
+    params: Mapping[str, str],
+) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, str]]:
+    """
+    Split URL parameters into typed Django database settings, OPTIONS and
+    remaining unknown parameters.
+
+    :param params: URL query string parameters
+    :return: tuple with (settings, options, remaining params)
+
+    Example:
+    >>> parse_params({"conn_max_age": "60", "pool_max_size": "4", "x": "y"})
+    ({'CONN_MAX_AGE': 60}, {'pool': {'max_size': 4}}, {'x': 'y'})
+    """
+    settings: Dict[str, Any] = {}
+    options: Dict[str, Any] = {}
+    pool: Dict[str, Any] = {}
+    remaining: Dict[str, str] = {}
+
+    for key, value in params.items():
+        if key in SETTING_PARAMS:
+            name, parse = SETTING_PARAMS[key]
+            settings[name] = parse(value)
+        elif key in OPTION_PARAMS:
+            name, parse = OPTION_PARAMS[key]
+            options[name] = parse(value)
+        elif key in POOL_PARAMS:
+            name, parse = POOL_PARAMS[key]
+            pool[name] = parse(value)
+        elif key == "pool":
+            options["pool"] = parse_bool(value)
+        else:
+            remaining[key] = value
+
+    if pool:
+        if options.get("pool") is False:
+            raise ValueError("Pool parameters given with pool disabled")
+        options["pool"] = pool
+
+    return settings, options, remaining
+
+
 def database_conf_from_url(url: str) -> Dict[str, Any]:
     """
     Return a django-style database configuration based on ``url``.
@@ -202,7 +441,77 @@ def database_conf_from_url(url: str) -> Dict[str, Any]:
      ('SCHEMA', 'tweetschema'),
      ('USER', 'joar')]
     """
-    return {key.upper(): val for key, val in parse_database_url(url)._asdict().items()}
+    info = parse_database_url(url)
+    settings, options, params = parse_params(info.params)
+    if info.engine in SQLITE_ENGINES:
+        pragmas, params = parse_sqlite_pragmas(params)
+        if pragmas:
+            settings["PRAGMAS"] = pragmas
+
+    conf = {
+        key.upper(): val for key, val in info._replace(params=params)._asdict().items()
+    }
+    conf.update(settings)
+    if options:
+        conf["OPTIONS"] = options
+    return conf
+
+
+def split_hosts(url: str) -> List[str]:
+    """
+    Split a multi-host database URL into one URL per host.
+
+    :param url: Database URL with comma separated hosts
+    :return: List of database URLs
+
+    Example:
+    >>> split_hosts('pgsql://joar@primary:5432,replica/tweets')
+    ['pgsql://joar@primary:5432/tweets', 'pgsql://joar@replica/tweets']
+    """
+    url_parts = urlsplit(url)
+    userinfo, at, hosts = url_parts.netloc.rpartition("@")
+    return [
+        urlunsplit(url_parts._replace(netloc=userinfo + at + host))
+        for host in hosts.split(",")
+    ]
+
+
+def databases_from_urls(
+    url: str, *replica_urls: str, alias: str = "default"
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Return a django-style ``DATABASES`` mapping for a primary database and its
+    read replicas.
+
+    The first host of ``url`` is the primary, any other hosts of ``url`` and
+    all hosts of ``replica_urls`` are replicas. Replicas are named
+    ``<alias>_replica_<n>`` and mirror the primary in tests.
+
+    :param url: Primary, optionally multi-host, database URL
+    :param replica_urls: Replica database URLs
+    :param alias: Database alias of the primary
+    :return: Django-style DATABASES dict
+
+    Example:
+    >>> databases = databases_from_urls(
+    ...     'pgsql://joar@primary,replica/tweets',
+    ...     'pgsql://joar@other/tweets')
+    >>> {alias: conf['HOST'] for alias, conf in databases.items()}
+    ... # doctest: +NORMALIZE_WHITESPACE
+    {'default': 'primary',
+     'default_replica_1': 'replica',
+     'default_replica_2': 'other'}
+    """
+    primary, *replicas = split_hosts(url)
+    for replica_url in replica_urls:
+        replicas.extend(split_hosts(replica_url))
+
+    databases = {alias: database_conf_from_url(primary)}
+    for index, replica in enumerate(replicas, start=1):
+        conf = database_conf_from_url(replica)
+        conf["TEST"] = {"MIRROR": alias}
+        databases[f"{alias}_replica_{index}"] = conf
+    return databases
 
 
 def parse_database_url(url: str) -> DatabaseInfo:
@@ -253,3 +562,159 @@ def parse_database_url(url: str) -> DatabaseInfo:
         port=port,
         params=params,
     )
+
+
+CACHE_BACKEND_MAPPING: Final[Dict[str, _EngineReference]] = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "dummy": "django.core.cache.backends.dummy.DummyCache",
+    "file": Alias("filebased"),
+    "filebased": "django.core.cache.backends.filebased.FileBasedCache",
+    "db": Alias("database"),
+    "database": "django.core.cache.backends.db.DatabaseCache",
+    "memcached": Alias("pymemcache"),
+    "pymemcache": "django.core.cache.backends.memcached.PyMemcacheCache",
+    "pylibmc": "django.core.cache.backends.memcached.PyLibMCCache",
+    "redis": "django.core.cache.backends.redis.RedisCache",
+    "rediss": Alias("redis"),
+}
+
+
+def register_cache_backend(scheme: str, backend: _EngineReference) -> None:
+    """
+    Register a new cache backend.
+
+    :param scheme: The scheme that should be matched
+    :param backend: Dotted path to the cache backend class
+    """
+    CACHE_BACKEND_MAPPING.update({scheme: backend})
+
+
+CACHE_SETTING_PARAMS: Final[Dict[str, Tuple[str, _Parser]]] = {
+    "timeout": ("TIMEOUT", parse_optional_int),
+    "key_prefix": ("KEY_PREFIX", parse_str),
+    "version": ("VERSION", parse_int),
+    "key_function": ("KEY_FUNCTION", parse_str),
+}
+
+CACHE_OPTION_PARAMS: Final[Dict[str, _Parser]] = {
+    # Local memory, file based and database caches
+    "max_entries": parse_int,
+    "cull_frequency": parse_int,
+    # Memcached
+    "use_pooling": parse_bool,
+    "max_pool_size": parse_int,
+    "pool_idle_timeout": parse_int,
+    "connect_timeout": parse_int,
+    "no_delay": parse_bool,
+    # Redis connection pool
+    "db": parse_int,
+    "pool_class": parse_str,
+    "parser_class": parse_str,
+    "max_connections": parse_int,
+    "socket_timeout": parse_int,
+    "socket_connect_timeout": parse_int,
+    "retry_on_timeout": parse_bool,
+    "health_check_interval": parse_int,
+}
+
+
+class CacheInfo(NamedTuple):
+    backend: str
+    location: Union[str, List[str], None]
+    params: Dict[str, str]
+
+
+def parse_cache_location(url: str, backend: str) -> Union[str, List[str], None]:
+    """
+    Get the cache LOCATION of a cache URL, in the format of its backend.
+
+    :param url: Cache URL
+    :param backend: Cache backend
+    :return: Location string, list of servers or None
+    """
+    url_parts = urlsplit(url)
+    path = unquote_plus(url_parts.path)
+    locations: List[str]
+
+    if backend.endswith(".RedisCache"):
+        scheme = "rediss" if url_parts.scheme == "rediss" else "redis"
+        locations = [
+            urlunsplit((scheme, urlsplit(host_url).netloc, url_parts.path, "", ""))
+            for host_url in split_hosts(url)
+        ]
+    elif backend.endswith(("PyMemcacheCache", "PyLibMCCache")):
+        if not url_parts.netloc:
+            return f"unix:{path}" if path else None
+        locations = [urlsplit(host_url).netloc for host_url in split_hosts(url)]
+    elif backend.endswith(".FileBasedCache"):
+        return path or None
+    else:
+        return url_parts.netloc or None
+
+    return locations[0] if len(locations) == 1 else locations
+
+
+def parse_cache_url(url: str) -> CacheInfo:
+    """
+    Parse a cache URL and return a CacheInfo named tuple.
+
+    :param url: Cache URL
+    :return: CacheInfo instance
+
+    Example:
+    >>> parse_cache_url('redis://cache:6379/1?timeout=60')
+    ... # doctest: +NORMALIZE_WHITESPACE
+    CacheInfo(backend='django.core.cache.backends.redis.RedisCache',
+              location='redis://cache:6379/1',
+              params={'timeout': '60'})
+    """
+    url_parts = urlsplit(url)
+    backend = get_engine(url_parts.scheme, CACHE_BACKEND_MAPPING)
+
+    # Take the last element of every parameter list
+    params = {key: val.pop() for key, val in parse_qs(url_parts.query).items()}
+
+    return CacheInfo(
+        backend=backend,
+        location=parse_cache_location(url, backend),
+        params=params,
+    )
+
+
+def cache_conf_from_url(url: str) -> Dict[str, Any]:
+    """
+    Return a django-style cache configuration based on ``url``.
+
+    :param url: Cache URL
+    :return: Django-style cache configuration dict
+
+    Example:
+    >>> conf = cache_conf_from_url(
+    ...     'memcached://cache1:11211,cache2:11211'
+    ...     '?timeout=600&key_prefix=tweets&max_pool_size=4')
+    >>> sorted(conf.items())  # doctest: +NORMALIZE_WHITESPACE
+    [('BACKEND', 'django.core.cache.backends.memcached.PyMemcacheCache'),
+     ('KEY_PREFIX', 'tweets'),
+     ('LOCATION', ['cache1:11211', 'cache2:11211']),
+     ('OPTIONS', {'max_pool_size': 4}),
+     ('TIMEOUT', 600)]
+    """
+    info = parse_cache_url(url)
+
+    conf: Dict[str, Any] = {"BACKEND": info.backend}
+    if info.location is not None:
+        conf["LOCATION"] = info.location
+
+    options: Dict[str, Any] = {}
+    for key, value in info.params.items():
+        if key in CACHE_SETTING_PARAMS:
+            name, parse = CACHE_SETTING_PARAMS[key]
+            conf[name] = parse(value)
+        elif key in CACHE_OPTION_PARAMS:
+            options[key] = CACHE_OPTION_PARAMS[key](value)
+        else:
+            raise ValueError(f'Unknown cache parameter "{key}"')
+
+    if options:
+        conf["OPTIONS"] = options
+    return conf
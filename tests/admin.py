@@ -4,6 +4,7 @@ from django.http import HttpRequest, HttpResponse
 from django.urls import URLPattern, re_path
 
 from bananas import admin
+from bananas.admin.slow_queries import SlowQueriesAdminView
 
 
 @admin.register()
@@ -45,3 +46,6 @@ class SimpleAdminView(admin.AdminView):
 
     def special_permission_view(self, request: HttpRequest) -> HttpResponse:
         return self.render("simple.html", {"context": "special"})
+
+
+admin.register(SlowQueriesAdminView)
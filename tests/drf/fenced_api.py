@@ -6,12 +6,18 @@ from rest_framework.routers import DefaultRouter
 from rest_framework.serializers import ModelSerializer
 from rest_framework.viewsets import GenericViewSet
 
+from bananas.drf.conditional import (
+    ConditionalListModelMixin,
+    ConditionalRetrieveModelMixin,
+)
 from bananas.drf.fencing import (
+    FencedBulkUpdateModelMixin,
     FencedUpdateModelMixin,
     allow_if_match,
     allow_if_unmodified_since,
+    allow_if_version_match,
 )
-from tests.models import Parent
+from tests.models import Article, Document, Parent
 
 
 class SimpleSerializer(ModelSerializer):
@@ -34,9 +40,98 @@ class AllowIfMatchAPI(FencedUpdateModelMixin, GenericViewSet):
         return Parent.objects.all()
 
 
+class AtomicAllowIfUnmodifiedSinceAPI(AllowIfUnmodifiedSinceAPI):
+    atomic_fence = True
+
+
+class EarlyAllowIfUnmodifiedSinceAPI(AllowIfUnmodifiedSinceAPI):
+    early_fence = True
+
+
+class EarlyAllowIfMatchAPI(FencedUpdateModelMixin, GenericViewSet):
+    early_fence = True
+    fence = allow_if_match(operator.attrgetter("name"), version_field="name")
+    serializer_class = SimpleSerializer
+    queryset = Parent.objects.all()
+
+
+class AtomicAllowIfMatchAPI(FencedUpdateModelMixin, GenericViewSet):
+    atomic_fence = True
+    fence = allow_if_match(operator.attrgetter("name"), version_field="name")
+    serializer_class = SimpleSerializer
+    queryset = Parent.objects.all()
+
+
+class ConditionalAPI(
+    ConditionalRetrieveModelMixin, ConditionalListModelMixin, GenericViewSet
+):
+    serializer_class = SimpleSerializer
+    queryset = Parent.objects.all()
+
+    def get_etag(self, instance: Parent) -> str:  # type: ignore[override]
+        return instance.version
+
+
+class DocumentSerializer(ModelSerializer):
+    class Meta:
+        model = Document
+        fields = ("name", "version")
+
+
+class VersionedAPI(
+    ConditionalRetrieveModelMixin, FencedUpdateModelMixin, GenericViewSet
+):
+    atomic_fence = True
+    fence = allow_if_version_match()
+    serializer_class = DocumentSerializer
+    queryset = Document.objects.all()
+
+
+class BulkVersionedAPI(FencedBulkUpdateModelMixin, GenericViewSet):
+    fence = allow_if_version_match()
+    serializer_class = DocumentSerializer
+    queryset = Document.objects.all()
+    max_bulk_size = 3
+
+
+class BulkAllowIfUnmodifiedSinceAPI(FencedBulkUpdateModelMixin, GenericViewSet):
+    fence = allow_if_unmodified_since()
+    serializer_class = SimpleSerializer
+    queryset = Parent.objects.all()
+
+
+class ArticleSerializer(ModelSerializer):
+    class Meta:
+        model = Article
+        fields = ("title", "body", "version")
+
+
+class MergedAPI(FencedUpdateModelMixin, GenericViewSet):
+    merge_fence = True
+    fence = allow_if_version_match()
+    serializer_class = ArticleSerializer
+    queryset = Article.objects.all()
+
+
 router = DefaultRouter()
 router.include_format_suffixes = False
 router.register(r"if-unmodified", AllowIfUnmodifiedSinceAPI, "if-unmodified")
 router.register(r"if-match", AllowIfMatchAPI, "if-match")
+router.register(
+    r"atomic-if-unmodified", AtomicAllowIfUnmodifiedSinceAPI, "atomic-if-unmodified"
+)
+router.register(r"atomic-if-match", AtomicAllowIfMatchAPI, "atomic-if-match")
+
+router.register(
+    r"early-if-unmodified", EarlyAllowIfUnmodifiedSinceAPI, "early-if-unmodified"
+)
+router.register(r"early-if-match", EarlyAllowIfMatchAPI, "early-if-match")
+router.register(r"conditional", ConditionalAPI, "conditional")
+router.register(r"versioned", VersionedAPI, "versioned")
+router.register(r"bulk-versioned", BulkVersionedAPI, "bulk-versioned")
+router.register(
+    r"bulk-if-unmodified", BulkAllowIfUnmodifiedSinceAPI, "bulk-if-unmodified"
+)
+router.register(r"merged", MergedAPI, "merged")
 
 urlpatterns = [re_path("fenced", include(router.urls))]
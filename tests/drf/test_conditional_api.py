@@ -0,0 +1,142 @@
+from functools import partial
+
+import pytest
+from django.urls import reverse
+from django.utils.http import http_date
+
+rest_framework = pytest.importorskip("rest_framework")
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from tests.models import Parent
+
+
+class TestConditionalRetrieve(APITestCase):
+    url = staticmethod(partial(reverse, "conditional-detail"))
+
+    def test_returns_validators(self):
+        item = Parent.objects.create(name="Great!")
+        assert item.date_modified
+        response = self.client.get(self.url(args=(item.pk,)))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertDictEqual(response.data, {"name": "Great!"})
+        self.assertEqual(response["ETag"], f'"{item.version}"')
+        self.assertEqual(
+            response["Last-Modified"], http_date(item.date_modified.timestamp())
+        )
+
+    def test_returns_not_modified_for_matching_etag(self):
+        item = Parent.objects.create()
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                self.url(args=(item.pk,)),
+                HTTP_IF_NONE_MATCH=f'"other", W/"{item.version}"',
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], f'"{item.version}"')
+
+    def test_returns_not_modified_for_any_etag(self):
+        item = Parent.objects.create()
+        response = self.client.get(self.url(args=(item.pk,)), HTTP_IF_NONE_MATCH="*")
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_returns_representation_for_stale_etag(self):
+        item = Parent.objects.create()
+        response = self.client.get(
+            self.url(args=(item.pk,)), HTTP_IF_NONE_MATCH='"stale"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_returns_not_modified_since(self):
+        item = Parent.objects.create()
+        assert item.date_modified
+        response = self.client.get(
+            self.url(args=(item.pk,)),
+            HTTP_IF_MODIFIED_SINCE=http_date(item.date_modified.timestamp()),
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_returns_representation_when_modified_since(self):
+        item = Parent.objects.create()
+        assert item.date_modified
+        response = self.client.get(
+            self.url(args=(item.pk,)),
+            HTTP_IF_MODIFIED_SINCE=http_date(item.date_modified.timestamp() - 1),
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_ignores_invalid_if_modified_since(self):
+        item = Parent.objects.create()
+        response = self.client.get(
+            self.url(args=(item.pk,)), HTTP_IF_MODIFIED_SINCE="yesterday"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_if_none_match_takes_precedence(self):
+        item = Parent.objects.create()
+        assert item.date_modified
+        response = self.client.get(
+            self.url(args=(item.pk,)),
+            HTTP_IF_NONE_MATCH='"stale"',
+            HTTP_IF_MODIFIED_SINCE=http_date(item.date_modified.timestamp()),
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TestConditionalList(APITestCase):
+    url = staticmethod(partial(reverse, "conditional-list"))
+
+    def test_returns_not_modified_for_unchanged_list(self):
+        Parent.objects.create(name="a")
+        Parent.objects.create(name="b")
+        response = self.client.get(self.url())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        etag = response["ETag"]
+        self.assertTrue(etag.startswith('W/"'))
+
+        # A single aggregate query, without fetching any rows
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+        response = self.client.get(
+            self.url(), HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_changes_with_listed_rows(self):
+        item = Parent.objects.create(name="a")
+        etag = self.client.get(self.url())["ETag"]
+
+        other = Parent.objects.create(name="b")
+        response = self.client.get(self.url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+        etag = response["ETag"]
+        other.delete()
+        response = self.client.get(self.url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        etag = response["ETag"]
+        item.name = "c"
+        item.save()
+        response = self.client.get(self.url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{"name": "c"}])
+
+    def test_etag_depends_on_query(self):
+        Parent.objects.create(name="a")
+        etag = self.client.get(self.url())["ETag"]
+        response = self.client.get(self.url() + "?page=2", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_empty_list(self):
+        response = self.client.get(self.url())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("Last-Modified", response)
+        response = self.client.get(self.url(), HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
@@ -1,14 +1,30 @@
+import datetime
 from functools import partial
+from unittest import mock
 
 import pytest
+from django.core.exceptions import ImproperlyConfigured
 from django.urls import reverse
 from django.utils.http import http_date
 
 rest_framework = pytest.importorskip("rest_framework")
 from rest_framework import status
+from rest_framework.permissions import BasePermission
 from rest_framework.test import APITestCase
 
-from tests.models import Parent
+from bananas.drf.fencing import allow_if_unmodified_since
+from tests.models import Article, Document, Parent
+
+from .fenced_api import (
+    AtomicAllowIfUnmodifiedSinceAPI,
+    EarlyAllowIfUnmodifiedSinceAPI,
+    MergedAPI,
+)
+
+
+class DenyObjects(BasePermission):
+    def has_object_permission(self, request, view, obj):
+        return False
 
 
 class TestAllowIfUnmodifiedSince(APITestCase):
@@ -127,3 +143,364 @@ class TestAllowIfMatch(APITestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertDictEqual(response.data, {"name": "Great!"})
+
+
+class TestAtomicAllowIfUnmodifiedSince(APITestCase):
+    url = staticmethod(partial(reverse, "atomic-if-unmodified-detail"))
+
+    def test_updates_in_single_statement(self):
+        item = Parent.objects.create(name="Old")
+        assert item.date_modified
+        with self.assertNumQueries(2):
+            response = self.client.patch(
+                self.url(args=(item.pk,)),
+                data={"name": "Great!"},
+                HTTP_IF_UNMODIFIED_SINCE=http_date(item.date_modified.timestamp()),
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertDictEqual(response.data, {"name": "Great!"})
+
+        updated = Parent.objects.get(pk=item.pk)
+        self.assertEqual(updated.name, "Great!")
+        assert updated.date_modified
+        self.assertGreater(updated.date_modified, item.date_modified)
+
+    def test_returns_bad_request_for_missing_header(self):
+        item = Parent.objects.create()
+        response = self.client.patch(self.url(args=(item.pk,)), data={"name": "x"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_returns_precondition_failed_for_expired_token(self):
+        item = Parent.objects.create(name="Old")
+        assert item.date_modified
+        response = self.client.patch(
+            self.url(args=(item.pk,)),
+            data={"name": "Great!"},
+            HTTP_IF_UNMODIFIED_SINCE=http_date(item.date_modified.timestamp() - 1),
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Parent.objects.get(pk=item.pk).name, "Old")
+
+    def test_returns_precondition_failed_for_concurrent_update(self):
+        item = Parent.objects.create(name="Old")
+        assert item.date_modified
+        token = http_date(item.date_modified.timestamp())
+
+        # Modified by someone else after the instance was loaded
+        Parent.objects.filter(pk=item.pk).update(
+            name="Concurrent",
+            date_modified=item.date_modified + datetime.timedelta(seconds=2),
+        )
+        with mock.patch.object(
+            AtomicAllowIfUnmodifiedSinceAPI, "get_object", return_value=item
+        ):
+            response = self.client.patch(
+                self.url(args=(item.pk,)),
+                data={"name": "Great!"},
+                HTTP_IF_UNMODIFIED_SINCE=token,
+            )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Parent.objects.get(pk=item.pk).name, "Concurrent")
+
+
+class TestAtomicAllowIfMatch(APITestCase):
+    url = staticmethod(partial(reverse, "atomic-if-match-detail"))
+
+    def test_allows_request_for_matching_token(self):
+        item = Parent.objects.create(name="v1")
+        response = self.client.put(
+            self.url(args=(item.pk,)), data={"name": "v2"}, HTTP_IF_MATCH='"v1"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Parent.objects.get(pk=item.pk).name, "v2")
+
+    def test_returns_precondition_failed_for_mismatching_token(self):
+        item = Parent.objects.create(name="v1")
+        response = self.client.put(
+            self.url(args=(item.pk,)), data={"name": "v2"}, HTTP_IF_MATCH='"v0"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Parent.objects.get(pk=item.pk).name, "v1")
+
+
+class TestEarlyAllowIfUnmodifiedSince(APITestCase):
+    url = staticmethod(partial(reverse, "early-if-unmodified-detail"))
+
+    def test_rejects_expired_token_before_validation(self):
+        item = Parent.objects.create(name="Old")
+        assert item.date_modified
+        with mock.patch.object(
+            EarlyAllowIfUnmodifiedSinceAPI, "get_serializer"
+        ) as get_serializer, self.assertNumQueries(2):
+            response = self.client.put(
+                self.url(args=(item.pk,)),
+                data={"name": "Great!"},
+                HTTP_IF_UNMODIFIED_SINCE=http_date(item.date_modified.timestamp() - 1),
+            )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        get_serializer.assert_not_called()
+
+    def test_checks_permissions_before_rejecting(self):
+        item = Parent.objects.create(name="Old")
+        assert item.date_modified
+        with mock.patch.object(
+            EarlyAllowIfUnmodifiedSinceAPI, "permission_classes", [DenyObjects]
+        ):
+            response = self.client.put(
+                self.url(args=(item.pk,)),
+                data={"name": "Great!"},
+                HTTP_IF_UNMODIFIED_SINCE=http_date(item.date_modified.timestamp() - 1),
+            )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Parent.objects.get(pk=item.pk).name, "Old")
+
+    def test_allows_request_for_valid_token(self):
+        item = Parent.objects.create(name="Old")
+        assert item.date_modified
+        response = self.client.patch(
+            self.url(args=(item.pk,)),
+            data={"name": "Great!"},
+            HTTP_IF_UNMODIFIED_SINCE=http_date(item.date_modified.timestamp()),
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Parent.objects.get(pk=item.pk).name, "Great!")
+
+    def test_returns_not_found_for_missing_instance(self):
+        response = self.client.put(
+            self.url(args=(1,)),
+            data={"name": "Great!"},
+            HTTP_IF_UNMODIFIED_SINCE=http_date(0),
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_returns_bad_request_for_missing_header(self):
+        item = Parent.objects.create()
+        response = self.client.put(self.url(args=(item.pk,)), data={"name": "x"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestEarlyAllowIfMatch(APITestCase):
+    url = staticmethod(partial(reverse, "early-if-match-detail"))
+
+    def test_rejects_mismatching_token_before_validation(self):
+        item = Parent.objects.create(name="v1")
+        # Checking the fence, then loading the instance to check permissions
+        with self.assertNumQueries(2):
+            response = self.client.patch(
+                self.url(args=(item.pk,)), data={"name": "v2"}, HTTP_IF_MATCH='"v0"'
+            )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+    def test_allows_request_for_matching_token(self):
+        item = Parent.objects.create(name="v1")
+        response = self.client.patch(
+            self.url(args=(item.pk,)), data={"name": "v2"}, HTTP_IF_MATCH='"v0", "v1"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Parent.objects.get(pk=item.pk).name, "v2")
+
+
+class TestAllowIfVersionMatch(APITestCase):
+    url = staticmethod(partial(reverse, "versioned-detail"))
+
+    def test_returns_version_etag(self):
+        item = Document.objects.create(name="v1")
+        response = self.client.get(self.url(args=(item.pk,)))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["ETag"], '"1"')
+
+    def test_increments_version_on_update(self):
+        item = Document.objects.create(name="v1")
+        response = self.client.patch(
+            self.url(args=(item.pk,)), data={"name": "v2"}, HTTP_IF_MATCH='"1"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertDictEqual(response.data, {"name": "v2", "version": 2})
+
+        # Updates within the same second are told apart
+        response = self.client.patch(
+            self.url(args=(item.pk,)), data={"name": "v3"}, HTTP_IF_MATCH='"1"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Document.objects.get(pk=item.pk).name, "v2")
+
+    def test_returns_precondition_failed_for_invalid_token(self):
+        item = Document.objects.create(name="v1")
+        response = self.client.patch(
+            self.url(args=(item.pk,)), data={"name": "v2"}, HTTP_IF_MATCH='"v1"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+
+class TestBulkAllowIfVersionMatch(APITestCase):
+    url = staticmethod(partial(reverse, "bulk-versioned-bulk-partial-update"))
+
+    def test_applies_fences_per_item(self):
+        current = Document.objects.create(name="a")
+        stale = Document.objects.create(name="b")
+        Document.objects.filter(pk=stale.pk).update(name="B")
+
+        # Loads all items in one query, and writes in one transaction
+        with self.assertNumQueries(4):
+            response = self.client.patch(
+                self.url(),
+                data=[
+                    {"id": current.pk, "token": "1", "changes": {"name": "A"}},
+                    {"id": stale.pk, "token": "1", "changes": {"name": "b2"}},
+                    {"id": 0, "token": "1", "changes": {"name": "c"}},
+                ],
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertListEqual(
+            response.data,
+            [
+                {
+                    "id": current.pk,
+                    "status": status.HTTP_200_OK,
+                    "data": {"name": "A", "version": 2},
+                },
+                {
+                    "id": stale.pk,
+                    "status": status.HTTP_412_PRECONDITION_FAILED,
+                    "detail": "The resource does not fulfill the given preconditions",
+                },
+                {"id": 0, "status": status.HTTP_404_NOT_FOUND, "detail": "Not found."},
+            ],
+        )
+        self.assertListEqual(
+            list(Document.objects.order_by("pk").values_list("name", "version")),
+            [("A", 2), ("B", 2)],
+        )
+
+    def test_returns_per_item_bad_request(self):
+        first = Document.objects.create(name="a")
+        second = Document.objects.create(name="b")
+        response = self.client.patch(
+            self.url(),
+            data=[
+                {"id": first.pk, "token": "", "changes": {"name": "A"}},
+                {"id": second.pk, "token": "1", "changes": {"name": "x" * 256}},
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]["status"], status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0]["detail"], "Malformed token: ")
+        self.assertEqual(response.data[1]["status"], status.HTTP_400_BAD_REQUEST)
+        self.assertIn("name", response.data[1]["detail"])
+        self.assertFalse(Document.objects.filter(version__gt=1).exists())
+
+    def test_returns_bad_request_for_invalid_payload(self):
+        item = Document.objects.create(name="a")
+        for data in (
+            {"id": item.pk, "token": "1", "changes": {}},
+            [{"id": item.pk, "changes": {}}],
+            [{"token": "1", "changes": {}}],
+            [{"id": "a", "token": "1", "changes": {}}],
+            [{"id": item.pk, "token": "1", "changes": {}}] * 2,
+            [{"id": i, "token": "1", "changes": {}} for i in range(4)],
+        ):
+            with self.subTest(data=data):
+                response = self.client.patch(self.url(), data=data, format="json")
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestBulkAllowIfUnmodifiedSince(APITestCase):
+    url = staticmethod(partial(reverse, "bulk-if-unmodified-bulk-partial-update"))
+
+    def test_applies_fences_per_item(self):
+        item = Parent.objects.create(name="a")
+        assert item.date_modified
+        response = self.client.patch(
+            self.url(),
+            data=[
+                {
+                    "id": item.pk,
+                    "token": http_date(item.date_modified.timestamp() - 1),
+                    "changes": {"name": "b"},
+                },
+            ],
+            format="json",
+        )
+        self.assertEqual(
+            response.data[0]["status"], status.HTTP_412_PRECONDITION_FAILED
+        )
+
+        response = self.client.patch(
+            self.url(),
+            data=[
+                {
+                    "id": item.pk,
+                    "token": http_date(item.date_modified.timestamp()),
+                    "changes": {"name": "b"},
+                },
+            ],
+            format="json",
+        )
+        self.assertEqual(response.data[0]["status"], status.HTTP_200_OK)
+        self.assertEqual(Parent.objects.get(pk=item.pk).name, "b")
+
+
+class TestMergedAllowIfVersionMatch(APITestCase):
+    url = staticmethod(partial(reverse, "merged-detail"))
+
+    def test_accepts_stale_update_of_unchanged_fields(self):
+        item = Article.objects.create(title="a", body="a")
+        response = self.client.patch(
+            self.url(args=(item.pk,)), data={"title": "b"}, HTTP_IF_MATCH='"1"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # Based on version 1, but the body hasn't changed since
+        response = self.client.patch(
+            self.url(args=(item.pk,)), data={"body": "b"}, HTTP_IF_MATCH='"1"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertDictEqual(response.data, {"title": "b", "body": "b", "version": 3})
+
+    def test_rejects_stale_update_of_changed_fields(self):
+        item = Article.objects.create(title="a", body="a")
+        item.title = "b"
+        item.save(update_fields=["title"])
+
+        response = self.client.patch(
+            self.url(args=(item.pk,)),
+            data={"title": "c", "body": "c"},
+            HTTP_IF_MATCH='"1"',
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        item.refresh_from_db()
+        self.assertEqual((item.title, item.body), ("b", "a"))
+
+    def test_rejects_update_newer_than_current_version(self):
+        item = Article.objects.create(title="a", body="a")
+        item.title = "b"
+        item.save(update_fields=["title"])
+
+        response = self.client.patch(
+            self.url(args=(item.pk,)),
+            data={"title": "c"},
+            HTTP_IF_MATCH='"99999"',
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        item.refresh_from_db()
+        self.assertEqual(item.title, "b")
+
+    def test_requires_version_fence(self):
+        item = Article.objects.create(title="a")
+        with mock.patch.object(
+            MergedAPI, "fence", allow_if_unmodified_since()
+        ), self.assertRaises(ImproperlyConfigured):
+            self.client.patch(
+                self.url(args=(item.pk,)),
+                data={"body": "b"},
+                HTTP_IF_UNMODIFIED_SINCE=http_date(0),
+            )
+
+    def test_rejects_invalid_token(self):
+        item = Article.objects.create(title="a")
+        response = self.client.patch(
+            self.url(args=(item.pk,)), data={"body": "b"}, HTTP_IF_MATCH='"a"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
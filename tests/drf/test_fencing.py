@@ -4,6 +4,7 @@ from unittest import TestCase
 
 import pytest
 from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Q
 from django.test.utils import isolate_apps, override_settings
 from django.utils.http import http_date
 
@@ -16,6 +17,7 @@ from rest_framework.exceptions import ErrorDetail
 from bananas.drf.errors import BadRequest
 from bananas.drf.fencing import (
     Fence,
+    allow_if_match,
     allow_if_unmodified_since,
     as_set,
     header_date_parser,
@@ -124,6 +126,53 @@ class TestFence(TestCase):
 
         self.assertIs(fence.check(FakeRequest.fake(), "a"), True)
 
+    def test_condition_from_token(self):
+        def get_token(_request):
+            return "a"
+
+        fence = Fence(
+            get_token=get_token,
+            compare=operator.eq,
+            get_version=operator.attrgetter("version"),
+            openapi_parameter=self.openapi_parameter,
+            get_condition=lambda token: Q(version=token),
+        )
+
+        self.assertEqual(fence.condition(FakeRequest.fake()), Q(version="a"))
+
+    def test_condition_raises_improperly_configured_when_unsupported(self):
+        fence = Fence(
+            get_token=lambda _request: "a",
+            compare=operator.eq,
+            get_version=operator.attrgetter("version"),
+            openapi_parameter=self.openapi_parameter,
+        )
+
+        with self.assertRaises(ImproperlyConfigured):
+            fence.condition(FakeRequest.fake())
+
+    def test_parse_token_raises_improperly_configured_when_unsupported(self):
+        fence = Fence(
+            get_token=lambda _request: "a",
+            compare=operator.eq,
+            get_version=operator.attrgetter("version"),
+            openapi_parameter=self.openapi_parameter,
+        )
+
+        with self.assertRaises(ImproperlyConfigured):
+            fence.parse_token("a")
+
+    def test_check_token(self):
+        fence = allow_if_match(operator.itemgetter("version"))
+        token = fence.parse_token('"a", "b"')
+
+        self.assertEqual(token, frozenset({"a", "b"}))
+        self.assertIs(fence.check_token(token, {"version": "b"}), True)
+        self.assertIs(fence.check_token(token, {"version": "c"}), False)
+        self.assertIs(fence.check_token(token, {"version": None}), True)
+        with self.assertRaises(ValueError):
+            fence.parse_token(" ")
+
 
 class TestHeaderDateParser(TestCase):
     def test_raises_bad_request_for_header_error(self):
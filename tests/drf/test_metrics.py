@@ -0,0 +1,187 @@
+import math
+from functools import partial
+from unittest import TestCase
+
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+rest_framework = pytest.importorskip("rest_framework")
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from bananas.drf import metrics
+from bananas.drf.errors import PreconditionFailed
+from bananas.drf.metrics import InMemoryFenceMetrics, fence_metrics
+from tests.models import Document, Parent
+
+
+class RecordingCollector(metrics.FenceMetricsCollector):
+    def __init__(self):
+        self.calls = []
+
+    def increment(self, view, outcome):
+        self.calls.append((view, outcome))
+
+    def observe(self, view, stage, duration):
+        pass
+
+
+recording_collector = RecordingCollector()
+
+
+class TestInMemoryFenceMetrics(TestCase):
+    def test_counts_outcomes(self):
+        collector = InMemoryFenceMetrics()
+        collector.increment("a", metrics.ACCEPTED)
+        collector.increment("a", metrics.ACCEPTED)
+        collector.increment("b", metrics.REJECTED)
+        self.assertEqual(collector.get_count("a", metrics.ACCEPTED), 2)
+        self.assertEqual(collector.get_count("a", metrics.REJECTED), 0)
+        self.assertDictEqual(
+            collector.get_counts(),
+            {("a", metrics.ACCEPTED): 2, ("b", metrics.REJECTED): 1},
+        )
+
+        collector.clear()
+        self.assertDictEqual(collector.get_counts(), {})
+
+    def test_observes_durations(self):
+        collector = InMemoryFenceMetrics()
+        collector.buckets = (0.1, 1.0, math.inf)
+        for duration in (0.05, 0.1, 0.5, 2.0):
+            collector.observe("a", "check", duration)
+
+        histogram = collector.get_histogram("a", "check")
+        self.assertTupleEqual(histogram.buckets, (0.1, 1.0, math.inf))
+        self.assertTupleEqual(histogram.counts, (2, 3, 4))
+        self.assertEqual(histogram.samples, 4)
+        self.assertAlmostEqual(histogram.sum, 2.65)
+
+        histogram = collector.get_histogram("a", "parse")
+        self.assertTupleEqual(histogram.counts, (0, 0, 0))
+        self.assertEqual(histogram.samples, 0)
+
+    def test_ignores_outside_of_scope(self):
+        fence_metrics.clear()
+        with metrics.observe("check"):
+            metrics.increment(metrics.ACCEPTED)
+        self.assertDictEqual(fence_metrics.get_counts(), {})
+
+    def test_track_counts_outcome(self):
+        fence_metrics.clear()
+        rejection = PreconditionFailed()
+        with metrics.track("a", rejection):
+            pass
+        with self.assertRaises(PreconditionFailed), metrics.track("a", rejection):
+            raise rejection
+        with self.assertRaises(PreconditionFailed), metrics.track("a", rejection):
+            raise PreconditionFailed()
+        self.assertDictEqual(
+            fence_metrics.get_counts(),
+            {("a", metrics.ACCEPTED): 1, ("a", metrics.REJECTED): 1},
+        )
+
+    @override_settings(
+        BANANAS_FENCE_METRICS_COLLECTOR="tests.drf.test_metrics.recording_collector"
+    )
+    def test_get_collector_from_settings(self):
+        self.assertIs(metrics.get_collector(), recording_collector)
+
+    @override_settings(
+        BANANAS_FENCE_METRICS_COLLECTOR="tests.drf.test_metrics.RecordingCollector"
+    )
+    def test_get_collector_class_from_settings(self):
+        collector = metrics.get_collector()
+        self.assertIsInstance(collector, RecordingCollector)
+        self.assertIs(metrics.get_collector(), collector)
+
+
+class TestFenceMetrics(APITestCase):
+    url = staticmethod(partial(reverse, "if-unmodified-detail"))
+    view = "AllowIfUnmodifiedSinceAPI"
+
+    def setUp(self):
+        fence_metrics.clear()
+
+    def test_counts_outcomes(self):
+        item = Parent.objects.create()
+        assert item.date_modified
+        url = self.url(args=(item.pk,))
+        timestamp = item.date_modified.timestamp()
+
+        self.client.put(url, data={"name": "a"})
+        self.client.put(url, data={"name": "a"}, HTTP_IF_UNMODIFIED_SINCE="")
+        self.client.put(
+            url, data={"name": "a"}, HTTP_IF_UNMODIFIED_SINCE=http_date(timestamp - 1)
+        )
+        response = self.client.put(
+            url, data={"name": "a"}, HTTP_IF_UNMODIFIED_SINCE=http_date(timestamp)
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Not a fence outcome
+        self.client.put(
+            url, data={"name": "a" * 256}, HTTP_IF_UNMODIFIED_SINCE=http_date(0)
+        )
+
+        self.assertDictEqual(
+            fence_metrics.get_counts(),
+            {
+                (self.view, metrics.MISSING_HEADER): 1,
+                (self.view, metrics.MALFORMED_HEADER): 1,
+                (self.view, metrics.REJECTED): 1,
+                (self.view, metrics.ACCEPTED): 1,
+            },
+        )
+        self.assertEqual(fence_metrics.get_histogram(self.view, "parse").samples, 4)
+        self.assertEqual(fence_metrics.get_histogram(self.view, "check").samples, 4)
+        self.assertEqual(fence_metrics.get_histogram(self.view, "update").samples, 1)
+
+    @override_settings(
+        BANANAS_FENCE_METRICS_COLLECTOR="tests.drf.test_metrics.recording_collector"
+    )
+    def test_uses_configured_collector(self):
+        recording_collector.calls.clear()
+        item = Parent.objects.create()
+        self.client.put(self.url(args=(item.pk,)), data={"name": "a"})
+        self.assertListEqual(
+            recording_collector.calls, [(self.view, metrics.MISSING_HEADER)]
+        )
+        self.assertDictEqual(fence_metrics.get_counts(), {})
+
+    def test_counts_bulk_outcomes_per_item(self):
+        view = "BulkVersionedAPI"
+        item = Document.objects.create(name="a")
+        self.client.patch(
+            reverse("bulk-versioned-bulk-partial-update"),
+            data=[
+                {"id": item.pk, "token": "1", "changes": {"name": "b"}},
+                {"id": 0, "token": "1", "changes": {"name": "b"}},
+            ],
+            format="json",
+        )
+        other = Document.objects.create(name="c")
+        self.client.patch(
+            reverse("bulk-versioned-bulk-partial-update"),
+            data=[
+                {"id": item.pk, "token": "1", "changes": {"name": "c"}},
+                {"id": other.pk, "token": "", "changes": {"name": "d"}},
+            ],
+            format="json",
+        )
+        # Passing the fence, but invalid
+        self.client.patch(
+            reverse("bulk-versioned-bulk-partial-update"),
+            data=[{"id": other.pk, "token": "1", "changes": {"name": "x" * 256}}],
+            format="json",
+        )
+        self.assertDictEqual(
+            fence_metrics.get_counts(),
+            {
+                (view, metrics.ACCEPTED): 1,
+                (view, metrics.REJECTED): 1,
+                (view, metrics.MALFORMED_HEADER): 1,
+            },
+        )
+        self.assertEqual(fence_metrics.get_histogram(view, "update").samples, 3)
@@ -1,14 +1,21 @@
 from typing import TYPE_CHECKING, NoReturn
 
 from django.db import models
-from django.db.models import Model
+from django.db.models import Model, QuerySet
 from django.db.models.manager import Manager
 
 from bananas.models import (
+    FieldVersionedModel,
+    FieldVersionedQuerySetMixin,
     SecretField,
+    SecretQuerySetMixin,
+    TimeOrderedUUIDModel as BananasTimeOrderedUUIDModel,
     TimeStampedModel,
+    TimeStampedQuerySetMixin,
     URLSecretField,
     UUIDModel as BananasUUIDModel,
+    VersionedModel,
+    VersionedQuerySetMixin,
 )
 from bananas.query import ExtendedQuerySet, ModelDictManagerMixin
 
@@ -34,11 +41,11 @@ class Simple(BananasModel):
 
 if TYPE_CHECKING:
 
-    class ParentQuerySet(ExtendedQuerySet["Parent"]): ...
+    class ParentQuerySet(TimeStampedQuerySetMixin, ExtendedQuerySet["Parent"]): ...
 
 else:
 
-    class ParentQuerySet(ExtendedQuerySet): ...
+    class ParentQuerySet(TimeStampedQuerySetMixin, ExtendedQuerySet): ...
 
 
 ParentManager = Manager.from_queryset(ParentQuerySet)
@@ -95,15 +102,52 @@ class Node(TimeStampedModel, BananasModel):
     objects = NodeManager()
 
 
+class DocumentQuerySet(VersionedQuerySetMixin, QuerySet): ...
+
+
+DocumentManager = Manager.from_queryset(DocumentQuerySet)
+
+
+class Document(VersionedModel, BananasModel):
+    name = models.CharField(max_length=255)
+    objects = DocumentManager()
+
+
+class ArticleQuerySet(FieldVersionedQuerySetMixin, QuerySet): ...
+
+
+ArticleManager = Manager.from_queryset(ArticleQuerySet)
+
+
+class Article(FieldVersionedModel, BananasModel):
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    parent = models.ForeignKey(Parent, null=True, on_delete=models.SET_NULL)
+    objects = ArticleManager()
+
+
 class UUIDModel(BananasUUIDModel, BananasModel):
     text = models.CharField(max_length=255)
     parent = models.ForeignKey("UUIDModel", null=True, on_delete=models.CASCADE)
 
 
+class TimeOrderedUUIDModel(BananasTimeOrderedUUIDModel, BananasModel):
+    text = models.CharField(max_length=255)
+
+
+class SecretQuerySet(SecretQuerySetMixin, QuerySet): ...
+
+
+SecretManager = Manager.from_queryset(SecretQuerySet)
+
+
 class SecretModel(BananasModel):
     secret = SecretField()
+    objects = SecretManager()
 
 
 class URLSecretModel(BananasModel):
     # num_bytes=25 forces the base64 algorithm to pad
     secret = URLSecretField(num_bytes=25, min_bytes=25)
+    other_secret = URLSecretField(num_bytes=24, min_bytes=24)
+    objects = SecretManager()
@@ -4,10 +4,13 @@ from typing import ClassVar
 
 from django.contrib.auth.models import AnonymousUser, Group, Permission, User
 from django.core.management import call_command
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from bananas import admin
+from bananas.query import slow_queries
+
+from .models import Simple
 
 
 @contextmanager
@@ -185,3 +188,21 @@ class AdminTest(TestCase):
         # No access to other views
         self.assert_unauthorized(self.custom_url)
         self.assert_unauthorized(self.detail_url)
+
+    @override_settings(BANANAS_SLOW_QUERY_THRESHOLD=0)
+    def test_slow_queries_view(self):
+        staff_user = self.staff_user
+        self.client.force_login(staff_user)
+        url = reverse("admin:bananas_slowqueries")
+        self.assert_unauthorized(url)
+
+        perm = Permission.objects.get(codename="can_access_slowqueries")
+        staff_user.user_permissions.add(perm)
+
+        slow_queries.clear()
+        list(Simple.objects.dicts("name"))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["slow_queries"]), 1)
+        self.assertContains(response, "tests_simple")
+        slow_queries.clear()
@@ -1,11 +1,15 @@
+import datetime
+from io import StringIO
 from unittest import mock
 
 import pytest
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from django.utils import timezone
 
 from bananas.management.commands import show_urls
 
+from .models import Child, Parent
 from .utils import drf_installed
 
 
@@ -16,7 +20,7 @@ class CommandTests(TestCase):
     def test_show_urls(self):
         urls = show_urls.collect_urls()
 
-        admin_api_url_count = 45
+        admin_api_url_count = 59
         self.assertEqual(len(urls), admin_api_url_count)
 
         with mock.patch.object(show_urls.sys, "stdout", autospec=True) as stdout:  # type: ignore[attr-defined]
@@ -25,3 +29,53 @@ class CommandTests(TestCase):
         self.assertEqual(stdout.write.call_count, admin_api_url_count)
 
         call_command("show_urls")
+
+
+class PruneTests(TestCase):
+    def setUp(self):
+        self.old = [Parent.objects.create(name=str(i)) for i in range(5)]
+        Parent.objects.filter(pk__in=[p.pk for p in self.old]).update(
+            date_created=timezone.now() - datetime.timedelta(days=10)
+        )
+        self.new = Parent.objects.create(name="new")
+
+    def call(self, *args, **kwargs):
+        stdout = StringIO()
+        call_command("prune", "tests.Parent", *args, stdout=stdout, **kwargs)
+        return stdout.getvalue()
+
+    def test_prune(self):
+        with mock.patch("bananas.management.commands.prune.time.sleep") as sleep:
+            output = self.call("--days=5", "--batch-size=2", "--sleep=0.5")
+
+        self.assertListEqual(list(Parent.objects.all()), [self.new])
+        self.assertEqual(sleep.call_count, 2)
+        self.assertIn("Deleted 2/5 rows", output)
+        self.assertIn("Deleted 4/5 rows", output)
+        self.assertIn("Deleted 5/5 rows", output)
+
+    def test_prune_cascades(self):
+        Child.objects.create(name="child", parent=self.old[0])
+        self.call("--days=5")
+        self.assertFalse(Child.objects.exists())
+        self.assertEqual(Parent.objects.count(), 1)
+
+    def test_prune_by_date_modified(self):
+        self.call("--days=5", "--field=date_modified")
+        self.assertEqual(Parent.objects.count(), 6)
+
+    def test_dry_run(self):
+        output = self.call("--days=5", "--dry-run")
+        self.assertIn("Would delete 5 rows", output)
+        self.assertEqual(Parent.objects.count(), 6)
+
+    def test_invalid_arguments(self):
+        for args in (
+            ("tests.Simple", "--days=5"),
+            ("tests.Missing", "--days=5"),
+            ("missing", "--days=5"),
+            ("tests.Parent", "--days=5", "--batch-size=0"),
+        ):
+            with self.subTest(args=args):
+                with self.assertRaises(CommandError):
+                    call_command("prune", *args)
@@ -1,5 +1,9 @@
+import os
+import tempfile
 from urllib.parse import quote
 
+from django.core.cache import CacheHandler
+from django.db.utils import ConnectionHandler
 from django.test import TestCase
 
 from bananas import url
@@ -104,3 +108,196 @@ class DBURLTest(TestCase):
                 "PASSWORD": None,
             },
         )
+
+    def test_db_url_settings_params(self):
+        conf = url.database_conf_from_url(
+            "postgres://5monkeys.se/tweets"
+            "?conn_max_age=60&conn_health_checks=true&atomic_requests=off"
+            "&connect_timeout=5&sslmode=require&hello=world"
+        )
+
+        self.assertEqual(conf["CONN_MAX_AGE"], 60)
+        self.assertIs(conf["CONN_HEALTH_CHECKS"], True)
+        self.assertIs(conf["ATOMIC_REQUESTS"], False)
+        self.assertDictEqual(
+            conf["OPTIONS"], {"connect_timeout": 5, "sslmode": "require"}
+        )
+        self.assertDictEqual(conf["PARAMS"], {"hello": "world"})
+
+        conf = url.database_conf_from_url(
+            "postgres://5monkeys.se/tweets?conn_max_age=None"
+        )
+        self.assertIsNone(conf["CONN_MAX_AGE"])
+        self.assertNotIn("OPTIONS", conf)
+
+    def test_db_url_pool_params(self):
+        conf = url.database_conf_from_url("postgres://5monkeys.se/tweets?pool=true")
+        self.assertDictEqual(conf["OPTIONS"], {"pool": True})
+
+        conf = url.database_conf_from_url(
+            "postgres://5monkeys.se/tweets?pool_min_size=2&pool_max_size=8&pool_timeout=10"
+        )
+        self.assertDictEqual(
+            conf["OPTIONS"], {"pool": {"min_size": 2, "max_size": 8, "timeout": 10}}
+        )
+
+        self.assertRaisesMessage(
+            ValueError,
+            "Pool parameters given with pool disabled",
+            url.database_conf_from_url,
+            "postgres://5monkeys.se/tweets?pool=false&pool_max_size=8",
+        )
+
+    def test_db_url_invalid_params(self):
+        self.assertRaises(
+            ValueError,
+            url.database_conf_from_url,
+            "postgres://5monkeys.se/tweets?conn_max_age=forever",
+        )
+        self.assertRaises(
+            ValueError,
+            url.database_conf_from_url,
+            "postgres://5monkeys.se/tweets?conn_health_checks=maybe",
+        )
+
+    def test_sqlite_pragmas(self):
+        conf = url.database_conf_from_url(
+            "sqlite:///db.sqlite3?journal_mode=WAL&synchronous=normal"
+            "&mmap_size=268435456&cache_size=-20000&busy_timeout=5000"
+            "&foreign_keys=true&hello=world"
+        )
+        self.assertDictEqual(
+            conf["PRAGMAS"],
+            {
+                "journal_mode": "wal",
+                "synchronous": "normal",
+                "mmap_size": 268435456,
+                "cache_size": -20000,
+                "busy_timeout": 5000,
+                "foreign_keys": "on",
+            },
+        )
+        self.assertDictEqual(conf["PARAMS"], {"hello": "world"})
+
+        conf = url.database_conf_from_url(
+            "postgres://5monkeys.se/tweets?synchronous=on"
+        )
+        self.assertNotIn("PRAGMAS", conf)
+        self.assertDictEqual(conf["PARAMS"], {"synchronous": "on"})
+
+        self.assertRaisesMessage(
+            ValueError,
+            'Invalid pragma value "wal; drop table x"',
+            url.database_conf_from_url,
+            "sqlite:///db.sqlite3?journal_mode=wal%3B+drop+table+x",
+        )
+
+    def test_sqlite_pragmas_applied_on_connect(self):
+        with tempfile.TemporaryDirectory() as directory:
+            name = quote(os.path.join(directory, "pragmas.sqlite3"), safe="")
+            handler = ConnectionHandler(
+                {
+                    "default": url.database_conf_from_url(
+                        f"sqlite:///{name}?journal_mode=wal&synchronous=normal"
+                        "&busy_timeout=1234"
+                    )
+                }
+            )
+            connection = handler["default"]
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode")
+                    self.assertEqual(cursor.fetchone()[0], "wal")
+                    cursor.execute("PRAGMA synchronous")
+                    self.assertEqual(cursor.fetchone()[0], 1)
+                    cursor.execute("PRAGMA busy_timeout")
+                    self.assertEqual(cursor.fetchone()[0], 1234)
+            finally:
+                connection.close()
+
+
+class CacheURLTest(TestCase):
+    def test_locmem(self):
+        conf = url.cache_conf_from_url(
+            "locmem://tweets?max_entries=1000&cull_frequency=4&timeout=none"
+        )
+        self.assertDictEqual(
+            conf,
+            {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "tweets",
+                "TIMEOUT": None,
+                "OPTIONS": {"max_entries": 1000, "cull_frequency": 4},
+            },
+        )
+
+        cache = CacheHandler({"default": conf})["default"]
+        cache.set("key", "value")
+        self.assertEqual(cache.get("key"), "value")
+
+    def test_backend_locations(self):
+        self.assertDictEqual(
+            url.cache_conf_from_url("dummy://"),
+            {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+        )
+        self.assertEqual(
+            url.cache_conf_from_url("file:///var/tmp/django_cache")["LOCATION"],
+            "/var/tmp/django_cache",
+        )
+        self.assertEqual(
+            url.cache_conf_from_url("db://cache_table")["LOCATION"], "cache_table"
+        )
+        self.assertEqual(
+            url.cache_conf_from_url("pymemcache:///tmp/memcached.sock")["LOCATION"],
+            "unix:/tmp/memcached.sock",
+        )
+        self.assertEqual(
+            url.cache_conf_from_url("pylibmc://cache:11211")["LOCATION"],
+            "cache:11211",
+        )
+
+    def test_redis(self):
+        conf = url.cache_conf_from_url(
+            "rediss://:hunter2@primary:6379,replica:6379/2"
+            "?max_connections=50&socket_timeout=5&retry_on_timeout=yes&version=3"
+        )
+        self.assertDictEqual(
+            conf,
+            {
+                "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                "LOCATION": [
+                    "rediss://:hunter2@primary:6379/2",
+                    "rediss://:hunter2@replica:6379/2",
+                ],
+                "VERSION": 3,
+                "OPTIONS": {
+                    "max_connections": 50,
+                    "socket_timeout": 5,
+                    "retry_on_timeout": True,
+                },
+            },
+        )
+
+    def test_unknown_parameter(self):
+        self.assertRaisesMessage(
+            ValueError,
+            'Unknown cache parameter "max_entrys"',
+            url.cache_conf_from_url,
+            "locmem://?max_entrys=10",
+        )
+        self.assertRaises(
+            ValueError, url.cache_conf_from_url, "locmem://?max_entries=many"
+        )
+
+    def test_register_cache_backend(self):
+        url.register_cache_backend("custom", "a.b.CustomCache")
+        self.assertDictEqual(
+            url.cache_conf_from_url("custom://somewhere"),
+            {"BACKEND": "a.b.CustomCache", "LOCATION": "somewhere"},
+        )
+        self.assertRaisesMessage(
+            KeyError,
+            "No matches for engine postgres",
+            url.cache_conf_from_url,
+            "postgres://somewhere",
+        )
@@ -1,16 +1,60 @@
+import copy
+import datetime
+import functools
+import os
+import pickle
+import sys
+import time
+import uuid
 from os import environ
-from typing import Dict, List
+from typing import Any, Dict, List
+from unittest import mock, skipUnless
 
 from django.conf import global_settings
 from django.core.exceptions import ValidationError
+from django.db import DatabaseError, OperationalError, connections
 from django.db.models import F
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.connection import ConnectionDoesNotExist
 
 from bananas import environment
 from bananas.environment import env
-from bananas.models import ModelDict
-
-from .models import Child, Node, Parent, SecretModel, Simple, URLSecretModel, UUIDModel
+from bananas.models import (
+    FrozenModelDict,
+    ModelDict,
+    SecretField,
+    TimeStampedManager,
+    TimeStampedQuerySet,
+    URLSecretField,
+    dumps_model_dicts,
+    loads_model_dicts,
+    pack_model_dicts,
+    unpack_model_dicts,
+    uuid7,
+)
+from bananas.query import (
+    ModelDictQuerySet,
+    OrderKey,
+    fan_out,
+    gather,
+    get_nulls_first,
+    slow_queries,
+)
+
+from .models import (
+    Article,
+    Child,
+    Document,
+    Node,
+    Parent,
+    SecretModel,
+    Simple,
+    TimeOrderedUUIDModel,
+    URLSecretModel,
+    UUIDModel,
+)
+from .utils import msgpack_installed
 
 
 class QuerySetTest(TestCase):
@@ -224,6 +268,43 @@ class QuerySetTest(TestCase):
         self.assertEqual(UUIDModel.objects.get(parent=first), second)
         self.assertEqual(UUIDModel.objects.get(parent__pk=first.pk), second)
 
+    def test_time_ordered_uuid_model(self):
+        first = TimeOrderedUUIDModel.objects.create(text="first")
+        second = TimeOrderedUUIDModel.objects.create(text="second")
+        self.assertEqual(first.id.version, 7)
+        self.assertLess(first.id, second.id)
+        self.assertListEqual(
+            list(TimeOrderedUUIDModel.objects.order_by("id")), [first, second]
+        )
+
+    def test_uuid7(self):
+        before = time.time_ns() // 1_000_000
+        uuids = [uuid7() for _ in range(10_000)]
+        after = time.time_ns() // 1_000_000
+
+        self.assertListEqual(uuids, sorted(uuids))
+        self.assertEqual(len(set(uuids)), len(uuids))
+        for value in (uuids[0], uuids[-1]):
+            self.assertEqual(value.version, 7)
+            self.assertEqual(value.variant, uuid.RFC_4122)
+            self.assertGreaterEqual(value.int >> 80, before)
+            self.assertLessEqual(value.int >> 80, after + 1)
+
+    def test_uuid7_is_monotonic_when_clock_moves_backwards(self):
+        first = uuid7()
+        with mock.patch("bananas.models.time.time_ns", return_value=0):
+            second = uuid7()
+        self.assertLess(first, second)
+        self.assertEqual(first.int >> 80, second.int >> 80)
+
+    def test_uuid7_counter_overflow(self):
+        first = uuid7()
+        with mock.patch("bananas.models._uuid7_counter", (1 << 42) - 1):
+            with mock.patch("bananas.models.time.time_ns", return_value=0):
+                second = uuid7()
+        self.assertLess(first, second)
+        self.assertEqual((first.int >> 80) + 1, second.int >> 80)
+
     def test_secret_field(self):
         model = SecretModel.objects.create()
 
@@ -266,6 +347,64 @@ class QuerySetTest(TestCase):
 
         self.assertRegex(model.secret, r"^[A-Za-z0-9._-]+$")
 
+    def test_generate_many(self):
+        for model in (SecretModel, URLSecretModel):
+            for field in model._meta.concrete_fields:
+                if not isinstance(field, SecretField):
+                    continue
+                with self.subTest(field=field):
+                    values = field.generate_many(50)
+                    self.assertEqual(len(set(values)), 50)
+                    for value in values:
+                        self.assertLessEqual(
+                            len(value), field.get_field_length(field.num_bytes)
+                        )
+                    self.assertListEqual(field.generate_many(0), [])
+
+        for name in ("secret", "other_secret"):
+            url_field = URLSecretModel._meta.get_field(name)
+            assert isinstance(url_field, URLSecretField)
+            size = url_field.num_bytes
+            random = os.urandom(size * 2)
+            self.assertListEqual(
+                url_field.encode_many(random, 2),
+                [
+                    url_field.y64_encode(random[:size]).decode(),
+                    url_field.y64_encode(random[size:]).decode(),
+                ],
+            )
+
+    def test_generate_many_validates_length(self):
+        field = SecretField(num_bytes=16, min_bytes=32)
+        with self.assertRaisesMessage(ValidationError, "Too few random bytes"):
+            field.generate_many(10)
+
+    def test_generate_many_with_custom_random(self):
+        class CustomSecretField(SecretField):
+            def get_random_bytes(self):
+                return b"a" * self.num_bytes
+
+        field = CustomSecretField(num_bytes=4, min_bytes=4)
+        self.assertListEqual(field.generate_many(2), ["61616161", "61616161"])
+
+    def test_bulk_create_secrets(self):
+        with mock.patch("bananas.models.os.urandom", wraps=os.urandom) as urandom:
+            SecretModel.objects.bulk_create(SecretModel() for _ in range(20))
+            URLSecretModel.objects.bulk_create([URLSecretModel() for _ in range(20)])
+        # One call per secret field
+        self.assertEqual(urandom.call_count, 3)
+
+        secrets = set(SecretModel.objects.values_list("secret", flat=True))
+        self.assertEqual(len(secrets), 20)
+        self.assertTrue(all(len(secret) == 64 for secret in secrets))
+        for field in ("secret", "other_secret"):
+            secrets = set(URLSecretModel.objects.values_list(field, flat=True))
+            self.assertEqual(len(secrets), 20)
+
+        # Pregenerated values are only used within bulk_create
+        model = SecretModel.objects.create()
+        self.assertEqual(len(model.secret), 64)
+
     def test_nested(self):
         md = ModelDict()
         md._nested = {"x": 1}  # type: ignore[dict-item]
@@ -277,6 +416,324 @@ class QuerySetTest(TestCase):
         self.assertEqual(md, {"on": False, "monkey": {"name": "Pato", "banana": True}})
 
 
+class FrozenModelDictTest(TestCase):
+    def test_hashable(self):
+        row = FrozenModelDict(id=1, parent__name="A")
+        self.assertEqual(hash(row), hash(FrozenModelDict(parent__name="A", id=1)))
+        self.assertEqual(len({row, FrozenModelDict(row), FrozenModelDict(id=2)}), 2)
+        self.assertEqual(row._hash, hash(row))
+
+        calls = []
+
+        @functools.lru_cache
+        def cached(row):
+            calls.append(row)
+            return row.id
+
+        self.assertEqual(cached(row), 1)
+        self.assertEqual(cached(FrozenModelDict(row)), 1)
+        self.assertEqual(len(calls), 1)
+
+    def test_immutable(self):
+        row = FrozenModelDict(id=1, parent__name="A")
+        mutations = [
+            lambda: row.__setitem__("id", 2),
+            lambda: row.__delitem__("id"),
+            lambda: row.__ior__({"id": 2}),
+            row.clear,
+            lambda: row.pop("id"),
+            row.popitem,
+            lambda: row.setdefault("name", "B"),
+            lambda: row.update(id=2),
+        ]
+        for mutation in mutations:
+            with self.subTest(mutation=mutation):
+                with self.assertRaisesMessage(TypeError, "immutable"):
+                    mutation()
+        self.assertEqual(row, {"id": 1, "parent__name": "A"})
+
+    def test_nested(self):
+        row = FrozenModelDict(id=1, parent__name="A")
+        self.assertIsInstance(row.parent, FrozenModelDict)
+        self.assertEqual(row.parent.name, "A")
+
+    def test_expand(self):
+        row = FrozenModelDict(id=1, parent__name="A", parent__child__name="B")
+        expanded = row.expand()
+        self.assertIsInstance(expanded, FrozenModelDict)
+        self.assertDictEqual(
+            expanded, {"id": 1, "parent": {"name": "A", "child": {"name": "B"}}}
+        )
+        self.assertIsInstance(expanded["parent"]["child"], FrozenModelDict)
+        self.assertEqual(
+            row, {"id": 1, "parent__name": "A", "parent__child__name": "B"}
+        )
+        self.assertEqual(hash(expanded), hash(row.expand()))
+
+    def test_pickle(self):
+        row = FrozenModelDict(id=1, parent__name="A")
+        unpickled = pickle.loads(pickle.dumps(row))
+        self.assertIsInstance(unpickled, FrozenModelDict)
+        self.assertEqual(unpickled, row)
+        self.assertEqual(hash(unpickled), hash(row))
+        self.assertIsInstance(copy.copy(row), FrozenModelDict)
+
+    def test_dicts(self):
+        Parent.objects.create(name="A")
+        Parent.objects.create(name="A")
+        rows = Parent.objects.dicts("name", frozen=True)
+        self.assertIsInstance(rows[0], FrozenModelDict)
+        self.assertSetEqual(set(rows), {FrozenModelDict(name="A")})
+
+        rows = Simple.objects.dicts(title="name", frozen=True)
+        self.assertListEqual(list(rows), [])
+        Simple.objects.create(name="S")
+        self.assertEqual(rows.get(), FrozenModelDict(title="S"))
+        self.assertNotIsInstance(Simple.objects.dicts("name").get(), FrozenModelDict)
+
+
+class ModelDictSerializationTest(TestCase):
+    rows = [
+        ModelDict(id=1, parent__name="A"),
+        ModelDict(id=2, parent__name="B"),
+    ]
+
+    def test_pickle_drops_nested_cache(self):
+        row = ModelDict(id=1, parent__name="A")
+        self.assertEqual(row.parent.name, "A")
+        self.assertIsNotNone(row._nested)
+
+        unpickled = pickle.loads(pickle.dumps(row))
+        self.assertIsInstance(unpickled, ModelDict)
+        self.assertEqual(unpickled, row)
+        self.assertIsNone(unpickled._nested)
+        self.assertEqual(unpickled.parent.name, "A")
+        self.assertEqual(len(pickle.dumps(row)), len(pickle.dumps(ModelDict(row))))
+
+    def test_pack(self):
+        keys, values = pack_model_dicts(self.rows)
+        self.assertTupleEqual(keys, ("id", "parent__name"))
+        self.assertListEqual(values, [[1, "A"], [2, "B"]])
+        self.assertListEqual(unpack_model_dicts((keys, values)), self.rows)
+        self.assertTupleEqual(pack_model_dicts([]), ((), []))
+
+    def test_pack_requires_same_keys(self):
+        for other in ({"id": 2}, {"id": 2, "name": "B"}):
+            with self.subTest(other=other):
+                with self.assertRaisesMessage(ValueError, "same keys"):
+                    pack_model_dicts([self.rows[0], other])
+
+    def test_pickle_round_trip(self):
+        data = dumps_model_dicts(self.rows)
+        self.assertLess(len(data), len(pickle.dumps(self.rows)))
+        rows = loads_model_dicts(data)
+        self.assertListEqual(rows, self.rows)
+        self.assertIsInstance(rows[0], ModelDict)
+
+    @skipUnless(msgpack_installed(), "msgpack not installed")
+    def test_msgpack_round_trip(self):
+        data = dumps_model_dicts(self.rows, serializer="msgpack")
+        self.assertListEqual(loads_model_dicts(data, serializer="msgpack"), self.rows)
+
+    def test_missing_msgpack(self):
+        with mock.patch.dict("sys.modules", {"msgpack": None}):
+            with self.assertRaisesMessage(ImportError, "msgpack extra"):
+                dumps_model_dicts(self.rows, serializer="msgpack")
+
+    def test_unknown_serializer(self):
+        with self.assertRaisesMessage(ValueError, "Unknown serializer"):
+            dumps_model_dicts(self.rows, serializer="json")
+
+
+class FanOutTest(TransactionTestCase):
+    def setUp(self):
+        for name in ("b", "a", "c"):
+            Parent.objects.create(name=name)
+
+    def test_ordered_merge(self):
+        rows = list(
+            fan_out(
+                Parent.objects.order_by("name").dicts("name"), ["default", "default"]
+            )
+        )
+        self.assertListEqual([row.name for row in rows], ["a", "a", "b", "b", "c", "c"])
+        self.assertIsInstance(rows[0], ModelDict)
+
+    def test_ordered_merge_on_renamed_descending_field(self):
+        queryset = Parent.objects.order_by("-name").dicts(title="name")
+        rows = list(fan_out(queryset, ["default", "default"]))
+        self.assertListEqual(
+            [row.title for row in rows], ["c", "c", "b", "b", "a", "a"]
+        )
+
+    def test_ordered_merge_with_nulls(self):
+        Parent.objects.filter(name="a").update(date_modified=None)
+        queryset = Parent.objects.dicts("name", "date_modified")
+
+        # SQLite sorts nulls as the smallest values
+        rows = fan_out(queryset.order_by("date_modified"), ["default", "default"])
+        self.assertListEqual([row.name for row in rows], list("aabbcc"))
+        rows = fan_out(queryset.order_by("-date_modified"), ["default", "default"])
+        self.assertListEqual([row.name for row in rows], list("ccbbaa"))
+
+        rows = fan_out(
+            queryset.order_by(F("date_modified").asc(nulls_last=True)),
+            ["default", "default"],
+        )
+        self.assertListEqual([row.name for row in rows], list("bbccaa"))
+        rows = fan_out(
+            queryset.order_by(F("date_modified").desc(nulls_first=True)),
+            ["default", "default"],
+        )
+        self.assertListEqual([row.name for row in rows], list("aaccbb"))
+
+    def test_nulls_order_of_databases(self):
+        ordering = [("a", False, None), ("b", True, None), ("c", False, True)]
+        self.assertListEqual(
+            get_nulls_first(ordering, ["default"]), [True, False, True]
+        )
+        features = connections["default"].features
+        with mock.patch.object(features, "nulls_order_largest", True):
+            self.assertListEqual(
+                get_nulls_first(ordering, ["default"]), [False, True, True]
+            )
+
+        other = mock.Mock(features=mock.Mock(nulls_order_largest=True))
+        with mock.patch(
+            "bananas.query.connections",
+            {"default": connections["default"], "other": other},
+        ):
+            with self.assertRaisesMessage(ValueError, "sorting nulls differently"):
+                get_nulls_first(ordering, ["default", "other"])
+            self.assertListEqual(
+                get_nulls_first([("c", False, True)], ["default", "other"]), [True]
+            )
+
+    def test_unordered_interleave(self):
+        rows = list(fan_out(Parent.objects.dicts("name"), ["default"] * 3))
+        self.assertEqual(len(rows), 9)
+        self.assertSetEqual({row.name for row in rows}, {"a", "b", "c"})
+
+    def test_early_exit(self):
+        rows = fan_out(
+            Parent.objects.order_by("name").dicts("name"),
+            ["default", "default"],
+            buffer_size=1,
+        )
+        self.assertEqual(next(rows).name, "a")
+        rows.close()  # type: ignore[attr-defined]
+
+    def test_propagates_errors(self):
+        queryset = Parent.objects.extra(where=["missing = 1"]).dicts("name")
+        with self.assertRaises(OperationalError):
+            list(fan_out(queryset, ["default", "default"]))
+
+        with self.assertRaises(ConnectionDoesNotExist):
+            list(fan_out(Parent.objects.dicts("name"), ["default", "missing"]))
+
+    def test_requires_dicts(self):
+        with self.assertRaisesMessage(ValueError, "returned from .dicts()"):
+            list(fan_out(Parent.objects.all(), ["default"]))
+
+    def test_requires_ordering_in_rows(self):
+        with self.assertRaisesMessage(ValueError, "include it in .dicts()"):
+            list(fan_out(Parent.objects.order_by("id").dicts("name"), ["default"]))
+
+        with self.assertRaisesMessage(ValueError, "unordered queryset"):
+            list(fan_out(Parent.objects.dicts("name"), ["default"], ordered=True))
+
+    def test_order_key(self):
+        self.assertLess(
+            OrderKey([1, None], [False, False], [False, False]),
+            OrderKey([2, 1], [False, False], [False, False]),
+        )
+        self.assertLess(
+            OrderKey([1, 1], [False, False], [False, False]),
+            OrderKey([1, None], [False, False], [False, False]),
+        )
+        self.assertLess(
+            OrderKey([1, None], [False, False], [False, True]),
+            OrderKey([1, 1], [False, False], [False, True]),
+        )
+        self.assertLess(OrderKey([None], [True], [True]), OrderKey([1], [True], [True]))
+        self.assertLess(OrderKey([2], [True], [True]), OrderKey([1], [True], [True]))
+        self.assertFalse(OrderKey([1], [True], [True]) < OrderKey([1], [True], [True]))
+
+
+class GatherTest(TransactionTestCase):
+    def test_gather(self):
+        parent = Parent.objects.create(name="A")
+        Child.objects.create(name="B", parent=parent)
+        Simple.objects.create(name="S")
+
+        parents, children, simples = gather(
+            Parent.objects.dicts("name"),
+            Child.objects.dicts("name", parent_name="parent__name"),
+            Simple.objects.all(),
+            max_workers=2,
+        )
+
+        self.assertListEqual(parents, [{"name": "A"}])
+        self.assertListEqual(children, [{"name": "B", "parent_name": "A"}])
+        self.assertEqual(simples[0].name, "S")
+
+    def test_gather_nothing(self):
+        self.assertListEqual(gather(), [])
+
+    def test_propagates_errors(self):
+        with self.assertRaises(OperationalError):
+            gather(Parent.objects.extra(where=["missing = 1"]))
+
+
+class SlowQueryTest(TestCase):
+    def setUp(self):
+        Simple.objects.create(name="S")
+        slow_queries.clear()
+        self.addCleanup(slow_queries.clear)
+
+    def test_disabled_by_default(self):
+        list(Simple.objects.dicts("name"))
+        self.assertEqual(len(slow_queries), 0)
+
+    @override_settings(BANANAS_SLOW_QUERY_THRESHOLD=60)
+    def test_ignores_fast_queries(self):
+        list(Simple.objects.dicts("name"))
+        self.assertEqual(len(slow_queries), 0)
+
+    @override_settings(BANANAS_SLOW_QUERY_THRESHOLD=0)
+    def test_captures_slow_queries(self):
+        self.assertListEqual(
+            list(Simple.objects.filter(name="S").dicts("name")), [{"name": "S"}]
+        )
+        list(Simple.objects.filter(name="T").dicts("name"))
+
+        first, second = slow_queries
+        self.assertEqual(first.using, "default")
+        self.assertIn("tests_simple", first.sql)
+        self.assertGreaterEqual(first.duration, 0)
+        self.assertIsNotNone(first.plan)
+        self.assertEqual(first.sql, second.sql)
+        self.assertNotEqual(first.params_fingerprint, second.params_fingerprint)
+
+    @override_settings(BANANAS_SLOW_QUERY_THRESHOLD=0, BANANAS_SLOW_QUERY_LOG_SIZE=2)
+    def test_log_is_bounded(self):
+        for name in ("A", "B", "C"):
+            list(Simple.objects.filter(name=name).dicts("name"))
+        self.assertEqual(len(slow_queries), 2)
+
+    @override_settings(BANANAS_SLOW_QUERY_THRESHOLD=0)
+    def test_unexplainable_query(self):
+        with mock.patch.object(ModelDictQuerySet, "explain", side_effect=DatabaseError):
+            list(Simple.objects.dicts("name"))
+        (query,) = slow_queries
+        self.assertIsNone(query.plan)
+
+    @override_settings(BANANAS_SLOW_QUERY_THRESHOLD=0)
+    def test_ignores_empty_queries(self):
+        self.assertListEqual(list(Simple.objects.filter(pk__in=[]).dicts("name")), [])
+        self.assertEqual(len(slow_queries), 0)
+
+
 class EnvTest(TestCase):
     def test_parse_bool(self):
         self.assertTrue(environment.parse_bool("True"))
@@ -369,6 +826,277 @@ class SettingsTest(TestCase):
         self.assertRaises(NotImplementedError, environment.get_settings)
         del environ["DJANGO_DATABASES"]
 
+    def test_nested_settings(self):
+        variables = {
+            "DJANGO_DATABASE_URL": "postgres://joar@5monkeys.se/tweets?conn_max_age=10",
+            "DJANGO_DATABASES__default__CONN_MAX_AGE": "60",
+            "DJANGO_DATABASES__default__OPTIONS__connect_timeout": "5",
+            "DJANGO_DATABASES__other__NAME": "other",
+            "DJANGO_DATABASES__other__PORT": "5432",
+            "DJANGO_CACHES__default__TIMEOUT": "none",
+            "DJANGO_CACHES__default__OPTIONS__max_entries": "1000",
+            "DJANGO_STORAGES__default__BACKEND": "a.b.Storage",
+        }
+        with mock.patch.dict(environ, variables):
+            settings = environment.get_settings()
+
+        databases = settings["DATABASES"]
+        self.assertEqual(
+            databases["default"]["ENGINE"], "django.db.backends.postgresql_psycopg2"
+        )
+        self.assertEqual(databases["default"]["USER"], "joar")
+        self.assertEqual(databases["default"]["CONN_MAX_AGE"], 60)
+        self.assertDictEqual(databases["default"]["OPTIONS"], {"connect_timeout": 5})
+        self.assertDictEqual(databases["other"], {"NAME": "other", "PORT": 5432})
+        self.assertDictEqual(
+            settings["CACHES"],
+            {"default": {"TIMEOUT": None, "OPTIONS": {"max_entries": 1000}}},
+        )
+        self.assertDictEqual(
+            settings["STORAGES"], {"default": {"BACKEND": "a.b.Storage"}}
+        )
+
+        with mock.patch.dict(environ, {"DJANGO_CACHE_URL": "locmem://?timeout=5"}):
+            self.assertDictEqual(
+                environment.get_settings()["CACHES"],
+                {
+                    "default": {
+                        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                        "TIMEOUT": 5,
+                    }
+                },
+            )
+
+        with mock.patch.dict(
+            environ, {"DJANGO_DATABASES__default__CONN_MAX_AGE": "forever"}
+        ):
+            self.assertRaises(ValueError, environment.get_settings)
+
+        with mock.patch.dict(environ, {"DJANGO_TEMPLATES__0__BACKEND": "x"}):
+            self.assertRaises(ValueError, environment.get_settings)
+
+    def test_lazy_module(self):
+        variables = {"DJANGO_DEBUG": "maybe", "DJANGO_SECRET_KEY": "123"}
+        with mock.patch.dict(environ, variables), mock.patch.dict(sys.modules):
+            sys.modules.pop("bananas.settings", None)
+            import bananas.settings as settings
+
+            self.assertIn("DEBUG", settings.__all__)
+            self.assertIn("SECRET_KEY", dir(settings))
+            self.assertNotIn("SECRET_KEY", vars(settings))
+            self.assertEqual(settings.SECRET_KEY, "123")
+            self.assertIn("SECRET_KEY", vars(settings))
+            with self.assertRaises(ValueError):
+                settings.DEBUG  # noqa: B018
+            with self.assertRaises(AttributeError):
+                settings.MISSING  # noqa: B018
+
+            self.assertRaises(ValueError, lambda: settings.ENV_SETTINGS)
+
+            sys.modules.pop("bananas.settings")
+            environ["DJANGO_ADMINS"] = "foobar"
+            with self.assertRaises(ValueError):
+                import bananas.settings
+
+    def test_nested_pool_and_pragma_settings(self):
+        variables = {
+            "DJANGO_DATABASES__default__OPTIONS__pool__min_size": "2",
+            "DJANGO_DATABASES__default__OPTIONS__pool__timeout": "10",
+            "DJANGO_DATABASES__default__OPTIONS__pool__other": "x",
+            "DJANGO_DATABASES__other__OPTIONS__pool": "false",
+            "DJANGO_DATABASES__other__PRAGMAS__journal_mode": "WAL",
+            "DJANGO_DATABASES__other__PRAGMAS__mmap_size": "268435456",
+            "DJANGO_DATABASES__other__PRAGMAS__foreign_keys": "true",
+        }
+        with mock.patch.dict(environ, variables):
+            databases = environment.get_settings()["DATABASES"]
+
+        self.assertDictEqual(
+            databases["default"],
+            {"OPTIONS": {"pool": {"min_size": 2, "timeout": 10, "other": "x"}}},
+        )
+        self.assertDictEqual(
+            databases["other"],
+            {
+                "OPTIONS": {"pool": False},
+                "PRAGMAS": {
+                    "journal_mode": "wal",
+                    "mmap_size": 268435456,
+                    "foreign_keys": "on",
+                },
+            },
+        )
+
+    def test_nested_settings_conflict(self):
+        variables = {
+            "DJANGO_DATABASES__default__OPTIONS__pool": "true",
+            "DJANGO_DATABASES__default__OPTIONS__pool__min_size": "2",
+        }
+        with mock.patch.dict(environ, variables):
+            self.assertRaises(ValueError, environment.get_settings)
+
+    def test_merge_settings(self):
+        settings: Dict[str, Any] = {
+            "DEBUG": False,
+            "DATABASES": {"default": {"ENGINE": "x", "NAME": "a"}},
+        }
+        databases = settings["DATABASES"]
+        environment.merge_settings(
+            settings,
+            {"DEBUG": True, "DATABASES": {"default": {"NAME": "b"}, "other": {}}},
+        )
+        self.assertDictEqual(
+            settings,
+            {
+                "DEBUG": True,
+                "DATABASES": {"default": {"ENGINE": "x", "NAME": "b"}, "other": {}},
+            },
+        )
+        # Nested dicts are copied rather than changed in place
+        self.assertDictEqual(databases, {"default": {"ENGINE": "x", "NAME": "a"}})
+
+
+class VersionedModelTest(TestCase):
+    def test_save_increments_version(self):
+        document = Document.objects.create(name="foo")
+        self.assertEqual(document.version, 1)
+
+        document.name = "bar"
+        document.save()
+        self.assertEqual(document.version, 2)
+
+        # Concurrent saves increment the stored version, not the loaded one
+        Document.objects.get(pk=document.pk).save(update_fields=["name"])
+        document.save(update_fields={"name"})
+        self.assertEqual(document.version, 4)
+        document.refresh_from_db()
+        self.assertEqual(document.version, 4)
+
+    def test_save_is_single_statement(self):
+        document = Document.objects.create(name="foo")
+        with self.assertNumQueries(1):
+            document.save()
+        self.assertEqual(document.version, 2)
+
+        with self.assertNumQueries(0):
+            document.save(update_fields=[])
+        self.assertEqual(document.version, 2)
+
+    def test_save_inserts_missing_row(self):
+        document = Document.objects.create(name="foo")
+        document.save()
+        document.delete()
+        document.save()
+        self.assertEqual(document.version, 2)
+        self.assertEqual(Document.objects.get(pk=document.pk).version, 2)
+
+        Document.objects.filter(pk=document.pk).delete()
+        document.save()
+        self.assertTrue(Document.objects.filter(pk=document.pk).exists())
+
+        document = Document.objects.get(pk=document.pk)
+        document.pk = None
+        document.save(force_insert=True)
+        self.assertEqual(Document.objects.get(pk=document.pk).version, 2)
+
+    def test_failed_save_keeps_version(self):
+        document = Document.objects.create(name="foo")
+        document.name = None
+        with self.assertRaises(DatabaseError):
+            document.save()
+        self.assertEqual(document.version, 1)
+
+    def test_update_increments_version(self):
+        document = Document.objects.create(name="foo")
+        Document.objects.filter(pk=document.pk).update(name="bar")
+        document.refresh_from_db()
+        self.assertEqual(document.version, 2)
+
+        Document.objects.filter(pk=document.pk).update(version=10)
+        document.refresh_from_db()
+        self.assertEqual(document.version, 10)
+
+    def test_bulk_update_increments_version(self):
+        documents = [Document.objects.create(name=name) for name in ("a", "b")]
+        Document.objects.filter(pk=documents[0].pk).update(name="A")
+        for document in documents:
+            document.name = document.name.upper()
+
+        fields = ("name",)
+        self.assertEqual(Document.objects.bulk_update(iter(documents), fields), 2)
+        self.assertTupleEqual(fields, ("name",))
+        self.assertListEqual([document.version for document in documents], [3, 2])
+        self.assertListEqual(
+            list(Document.objects.order_by("pk").values_list("name", "version")),
+            [("A", 3), ("B", 2)],
+        )
+
+        for document in documents:
+            document.version = 10
+        Document.objects.bulk_update(documents, ["version"])
+        self.assertSetEqual(
+            set(Document.objects.values_list("version", flat=True)), {10}
+        )
+
+
+class FieldVersionedModelTest(TestCase):
+    def test_save_records_field_versions(self):
+        article = Article.objects.create(title="foo")
+        self.assertDictEqual(article.field_versions, {})
+
+        article.title = "bar"
+        article.save(update_fields=["title"])
+        self.assertEqual(article.version, 2)
+        self.assertDictEqual(article.field_versions, {"title": 2})
+
+        # Records what other saves recorded concurrently
+        Article.objects.get(pk=article.pk).save(update_fields=["body"])
+        article.save(update_fields=["title"])
+        self.assertDictEqual(article.field_versions, {"title": 4, "body": 3})
+        self.assertListEqual(
+            article.get_changed_fields(2, ["title", "body"]),
+            [
+                "title",
+                "body",
+            ],
+        )
+        self.assertListEqual(
+            article.get_changed_fields(3, ["title", "body"]), ["title"]
+        )
+
+        article.save()
+        self.assertDictEqual(
+            article.field_versions, {"title": 5, "body": 5, "parent": 5}
+        )
+
+        # Saving no fields stays a no-op
+        with self.assertNumQueries(0):
+            article.save(update_fields=[])
+
+        # Attribute names are recorded by field name
+        article.parent = Parent.objects.create(name="foo")
+        article.save(update_fields=["parent_id"])
+        self.assertEqual(article.field_versions["parent"], 6)
+        self.assertListEqual(article.get_changed_fields(5, ["parent"]), ["parent"])
+
+    def test_bulk_updates_reset_field_versions(self):
+        article = Article.objects.create(title="foo")
+        article.save(update_fields=["title"])
+
+        Article.objects.filter(pk=article.pk).update(body="bar")
+        article.refresh_from_db()
+        self.assertEqual(article.version, 3)
+        self.assertIsNone(article.field_versions)
+        self.assertListEqual(article.get_changed_fields(2, ["title"]), ["title"])
+
+        article.save(update_fields=["body"])
+        self.assertDictEqual(article.field_versions, {"*": 3, "body": 4})
+        self.assertListEqual(article.get_changed_fields(3, ["title", "body"]), ["body"])
+
+        Article.objects.bulk_update([article], ["title"])
+        article.refresh_from_db()
+        self.assertIsNone(article.field_versions)
+
 
 class TimeStampedModelTest(TestCase):
     def test_date_modified(self):
@@ -392,3 +1120,93 @@ class TimeStampedModelTest(TestCase):
 
         parent.save(update_fields={"name"})
         parent.save(update_fields=("name",))
+
+    def test_update_sets_date_modified(self):
+        parent = Parent.objects.create(name="foo")
+        pre_date_modified = parent.date_modified
+
+        Parent.objects.filter(pk=parent.pk).update(name="bar")
+        parent.refresh_from_db()
+        self.assertEqual(parent.name, "bar")
+        assert parent.date_modified and pre_date_modified
+        self.assertGreater(parent.date_modified, pre_date_modified)
+
+        date_modified = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+        Parent.objects.filter(pk=parent.pk).update(date_modified=date_modified)
+        parent.refresh_from_db()
+        self.assertEqual(parent.date_modified, date_modified)
+
+    def test_bulk_update_sets_date_modified(self):
+        parents = [Parent.objects.create(name=name) for name in ("a", "b")]
+        pre_date_modified = {parent.pk: parent.date_modified for parent in parents}
+        for parent in parents:
+            parent.name = parent.name.upper()
+
+        fields = ("name",)
+        self.assertEqual(Parent.objects.bulk_update(iter(parents), fields), 2)
+        self.assertTupleEqual(fields, ("name",))
+        for parent in Parent.objects.all():
+            self.assertEqual(parent.name, parent.name.upper())
+            self.assertGreater(parent.date_modified, pre_date_modified[parent.pk])
+
+        date_modified = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+        for parent in parents:
+            parent.date_modified = date_modified
+        Parent.objects.bulk_update(parents, ["date_modified"])
+        self.assertSetEqual(
+            set(Parent.objects.values_list("date_modified", flat=True)),
+            {date_modified},
+        )
+
+    def test_manager(self):
+        queryset_class = getattr(TimeStampedManager, "_queryset_class", None)
+        self.assertIs(queryset_class, TimeStampedQuerySet)
+
+    def test_changed_since(self):
+        old = Parent.objects.create(name="old")
+        timestamp = datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc)
+        Parent.objects.filter(pk=old.pk).update(date_modified=timestamp)
+        parents = [Parent.objects.create(name=str(i)) for i in range(5)]
+        # Rows sharing the same date_modified must not be skipped
+        same = timezone.now()
+        Parent.objects.filter(pk__in=[p.pk for p in parents[1:4]]).update(
+            date_modified=same
+        )
+
+        since = timestamp + datetime.timedelta(seconds=1)
+        expected = list(
+            Parent.objects.filter(date_modified__gte=since)
+            .order_by("date_modified", "pk")
+            .values_list("pk", flat=True)
+        )
+        self.assertEqual(len(expected), 5)
+
+        seen = []
+        cursor = None
+        while True:
+            page = list(Parent.objects.changed_since(since, cursor=cursor)[:2])
+            if not page:
+                break
+            seen += [parent.pk for parent in page]
+            cursor = Parent.objects.change_cursor(page[-1])
+        self.assertListEqual(seen, expected)
+
+        rows = Parent.objects.changed_since(since).dicts("id", "date_modified")
+        cursor = Parent.objects.change_cursor(rows[0])
+        self.assertEqual(
+            cursor, Parent.objects.change_cursor(Parent.objects.get(pk=expected[0]))
+        )
+        self.assertEqual(
+            Parent.objects.changed_since(since, cursor=cursor)
+            .dicts("pk", "date_modified")
+            .count(),
+            4,
+        )
+        row = Parent.objects.changed_since(since).values("pk", "date_modified")[0]
+        self.assertEqual(Parent.objects.change_cursor(row), cursor)
+
+    def test_invalid_change_cursor(self):
+        for cursor in ("!", "Zm9v"):
+            with self.subTest(cursor=cursor):
+                with self.assertRaisesMessage(ValueError, "Invalid change cursor"):
+                    list(Parent.objects.changed_since(timezone.now(), cursor=cursor))
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.signals import request_started
+from django.test import TestCase, override_settings
+
+from bananas import routers
+from bananas.routers import ReplicaRouter, sticky_scope, use_primary
+
+from .models import Parent, Simple
+
+
+class TwoReplicaRouter(ReplicaRouter):
+    replicas = ["replica_1", "replica_2"]
+
+
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        routers.reset_primary()
+        self.router = TwoReplicaRouter()
+
+    def tearDown(self):
+        routers.reset_primary()
+
+    def test_reads_round_robin(self):
+        self.assertListEqual(
+            [self.router.db_for_read(Simple) for _ in range(3)],
+            ["replica_1", "replica_2", "replica_1"],
+        )
+
+    def test_sticky_primary_after_write(self):
+        self.assertEqual(self.router.db_for_read(Simple), "replica_1")
+        self.assertEqual(self.router.db_for_write(Simple), "default")
+        self.assertEqual(self.router.db_for_read(Simple), "default")
+
+        request_started.send(sender=self.__class__)
+        self.assertEqual(self.router.db_for_read(Simple), "replica_2")
+
+    def test_use_primary(self):
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Simple), "default")
+        self.assertEqual(self.router.db_for_read(Simple), "replica_1")
+
+    def test_use_primary_keeps_stickiness(self):
+        with use_primary():
+            self.assertEqual(self.router.db_for_write(Simple), "default")
+        self.assertEqual(self.router.db_for_read(Simple), "default")
+
+    def test_sticky_scope(self):
+        with sticky_scope():
+            self.assertEqual(self.router.db_for_write(Simple), "default")
+            self.assertEqual(self.router.db_for_read(Simple), "default")
+        self.assertEqual(self.router.db_for_read(Simple), "replica_1")
+
+        self.assertEqual(self.router.db_for_write(Simple), "default")
+        with sticky_scope():
+            self.assertEqual(self.router.db_for_read(Simple), "replica_2")
+        self.assertEqual(self.router.db_for_read(Simple), "default")
+
+    def test_discovers_test_mirrors(self):
+        databases = {
+            "default": {},
+            "default_replica_1": {"TEST": {"MIRROR": "default"}},
+            "other": {},
+        }
+        with mock.patch.object(
+            routers, "settings", SimpleNamespace(DATABASES=databases)
+        ):
+            self.assertListEqual(ReplicaRouter().get_replicas(), ["default_replica_1"])
+            self.assertEqual(ReplicaRouter().db_for_read(Simple), "default_replica_1")
+
+        self.assertEqual(ReplicaRouter().db_for_read(Simple), "default")
+
+    def test_allow_migrate_and_relation(self):
+        self.assertFalse(self.router.allow_migrate("replica_1", "tests"))
+        self.assertIsNone(self.router.allow_migrate("default", "tests"))
+
+        primary, replica, other = Simple(), Simple(), Simple()
+        primary._state.db = "default"
+        replica._state.db = "replica_2"
+        other._state.db = "other"
+        self.assertTrue(self.router.allow_relation(primary, replica))
+        self.assertIsNone(self.router.allow_relation(primary, other))
+
+    @override_settings(DATABASE_ROUTERS=[TwoReplicaRouter()])
+    def test_model_dict_reads(self):
+        self.assertEqual(Parent.objects.dicts("name").db, "replica_1")
+        self.assertEqual(Parent.objects.all().db, "replica_2")
+        self.assertEqual(Parent.objects.select_for_update().db, "default")
+        self.assertEqual(Parent.objects.dicts("name").db, "default")
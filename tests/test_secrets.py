@@ -1,5 +1,7 @@
 import os
+import tempfile
 from pathlib import Path
+from unittest import mock
 
 from django.test import TestCase
 
@@ -46,3 +48,62 @@ class SecretsTest(TestCase):
         with self.env:
             secret = secrets.get_secret("doesnotexist", default)
         self.assertEqual(secret, default)
+
+
+class SecretsStoreTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.secrets_dir = Path(self.directory.name)
+        (self.secrets_dir / "key").write_text("first")
+        self.env = EnvironmentVarGuard()
+
+    def test_get_cached_secret(self):
+        store = secrets.SecretsStore(check_interval=3600)
+        with self.env:
+            self.env.set(secrets.BANANAS_SECRETS_DIR_ENV_KEY, self.secrets_dir)
+            self.assertEqual(store.get("key"), "first")
+            self.assertIsNone(store.get("doesnotexist"))
+            self.assertEqual(store.get("doesnotexist", "default"), "default")
+
+            with mock.patch("builtins.open") as mock_open:
+                self.assertEqual(store.get("key"), "first")
+            mock_open.assert_not_called()
+
+            (self.secrets_dir / "key").write_text("second")
+            self.assertEqual(store.get("key"), "first")
+            store.refresh()
+            self.assertEqual(store.get("key"), "second")
+
+            # Changing secrets directory is noticed at once
+            self.env.set(
+                secrets.BANANAS_SECRETS_DIR_ENV_KEY,
+                Path(__file__).resolve().parent / "files",
+            )
+            self.assertEqual(store.get("hemlis"), "HEMLIS\n")
+            self.assertIsNone(store.get("key"))
+
+    def test_notices_rotation(self):
+        store = secrets.SecretsStore(check_interval=0)
+        with self.env:
+            self.env.set(secrets.BANANAS_SECRETS_DIR_ENV_KEY, self.secrets_dir)
+            self.assertEqual(store.get("key"), "first")
+
+            # Replace file like an atomic rename does, changing its inode
+            (self.secrets_dir / "key.tmp").write_text("rotated")
+            os.replace(self.secrets_dir / "key.tmp", self.secrets_dir / "key")
+            self.assertEqual(store.get("key"), "rotated")
+
+            (self.secrets_dir / "other").write_text("added")
+            os.utime(self.secrets_dir, ns=(0, 0))
+            self.assertEqual(store.get("other"), "added")
+
+            with mock.patch("builtins.open") as mock_open:
+                self.assertEqual(store.get("key"), "rotated")
+            mock_open.assert_not_called()
+
+    def test_default_check_interval(self):
+        with self.env:
+            self.env.set(secrets.BANANAS_SECRETS_CHECK_INTERVAL_ENV_KEY, "30")
+            self.assertEqual(secrets.SecretsStore().check_interval, 30)
+        self.assertEqual(secrets.secrets_store.check_interval, 1)
@@ -0,0 +1,77 @@
+import os
+import tempfile
+from urllib.parse import quote
+
+from django.core.signals import request_finished
+from django.db import connections
+from django.test import TestCase, override_settings
+
+from bananas.tenants import tenant_databases
+
+from .models import Simple
+
+
+class TenantDatabasesTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.addCleanup(tenant_databases.clear)
+
+    def get_url(self, name):
+        path = quote(os.path.join(self.directory.name, f"{name}.sqlite3"), safe="")
+        return f"sqlite:///{path}"
+
+    def create_tenant(self, name):
+        alias = tenant_databases.get_alias(self.get_url(name))
+
+        # Allow connecting to the added database for the rest of the test
+        databases = type(self).databases
+        type(self).databases = {*databases, alias}
+        self.addCleanup(setattr, type(self), "databases", databases)
+
+        with connections[alias].schema_editor() as schema_editor:
+            schema_editor.create_model(Simple)
+        return alias
+
+    def test_using_url(self):
+        alias = self.create_tenant("a")
+        self.create_tenant("b")
+        Simple.objects.using_url(self.get_url("a")).create(name="in a")
+
+        self.assertEqual(tenant_databases.get_alias(self.get_url("a")), alias)
+        self.assertEqual(len(tenant_databases), 2)
+        self.assertListEqual(
+            list(Simple.objects.using_url(self.get_url("a")).values_list("name")),
+            [("in a",)],
+        )
+        self.assertFalse(Simple.objects.using_url(self.get_url("b")).exists())
+
+        queryset = Simple.objects.all().using_url(self.get_url("a")).dicts("name")
+        self.assertEqual(queryset.db, alias)
+        self.assertEqual(queryset.get().name, "in a")
+
+    @override_settings(BANANAS_TENANT_DATABASES_SIZE=2)
+    def test_least_recently_used_eviction(self):
+        a = self.create_tenant("a")
+        b = self.create_tenant("b")
+        tenant_databases.get_alias(self.get_url("a"))
+        connection = connections[b]
+        self.assertIsNotNone(connection.connection)
+
+        c = self.create_tenant("c")
+        self.assertIn(a, tenant_databases)
+        self.assertNotIn(b, tenant_databases)
+        self.assertIn(c, tenant_databases)
+        self.assertNotIn(b, connections.settings)
+        self.assertIsNone(connection.connection)
+
+    @override_settings(BANANAS_TENANT_DATABASES_IDLE_TIMEOUT=0)
+    def test_close_idle(self):
+        alias = self.create_tenant("a")
+        connection = connections[alias]
+        self.assertIsNotNone(connection.connection)
+
+        request_finished.send(sender=self.__class__)
+        self.assertIsNone(connection.connection)
+        self.assertIn(alias, tenant_databases)
+        self.assertIn(alias, connections.settings)
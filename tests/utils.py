@@ -5,3 +5,12 @@ def drf_installed() -> bool:
         return True
     except ModuleNotFoundError:
         return False
+
+
+def msgpack_installed() -> bool:
+    try:
+        import msgpack
+
+        return True
+    except ModuleNotFoundError:
+        return False